@@ -0,0 +1,280 @@
+#!/usr/bin/env python3
+"""
+Topology Pipeline Benchmarks
+Times the parser, layout engine, icon manager and both renderers on synthetic
+topologies (scripts/generate-synthetic-topology.py) and appends the results to
+a JSONL history file so regressions show up run over run.
+
+    python benchmarks/run_benchmarks.py                      # 100 + 10k
+    python benchmarks/run_benchmarks.py --scales 100,10k,100k --repeat 3
+    python benchmarks/run_benchmarks.py --scales 100 --only cold_start
+"""
+
+import os
+import sys
+import json
+import time
+import platform
+import socket
+import argparse
+import tempfile
+import subprocess
+import importlib.util
+import urllib.error
+import urllib.request
+from datetime import datetime, timezone
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SERVER_DIR = os.path.join(REPO_ROOT, "server")
+DEFAULT_RESULTS = os.path.join(REPO_ROOT, "benchmarks", "results.jsonl")
+
+# Renderer benchmarks are skipped above this canvas size (pixels): a 3-byte RGB
+# canvas this big is already ~200 MB before PIL / python-pptx overhead
+MAX_RENDER_PIXELS = 64_000_000
+
+# Bumped when a benchmark starts measuring something else, so its older history
+# entries are not compared against (render_* v2: renderers draw the whole layout tree)
+BENCHMARK_VERSIONS = {"render_preview": 2, "render_png": 2, "render_pptx": 2}
+
+sys.path.insert(0, SERVER_DIR)
+
+
+def load_script(filename, module_name):
+    path = os.path.join(REPO_ROOT, "scripts", filename)
+    spec = importlib.util.spec_from_file_location(module_name, path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+synthetic = load_script("generate-synthetic-topology.py", "generate_synthetic_topology")
+parser_module = load_script("parse-relations.py", "parse_relations")
+
+
+class SkipBenchmark(Exception):
+    pass
+
+
+# --- Benchmarks -------------------------------------------------------------
+# Each takes the prepared case dict and returns nothing; ImportError = skipped
+# (renderers need pillow / python-pptx / svglib installed).
+# Renderers get the same layout the server would draw (aggregated above
+# AUTO_AGGREGATE_RESOURCES), and are skipped when its canvas exceeds MAX_RENDER_PIXELS.
+
+def check_canvas(case, scale=1.0):
+    pixels = case["canvas_pixels"] * scale * scale
+    if pixels > MAX_RENDER_PIXELS:
+        raise SkipBenchmark(f"canvas of {pixels / 1e6:.0f} Mpx exceeds MAX_RENDER_PIXELS")
+
+def bench_parse(case):
+    parser_module.parse_topology(case["raw"], case["rg"])
+
+
+def bench_layout(case):
+    from core.layout import LayoutEngine
+    LayoutEngine(case["topology"]).calculate_layout()
+
+
+def bench_layout_aggregated(case):
+    from core.layout import LayoutEngine
+    LayoutEngine(case["topology"], aggregate=True).calculate_layout()
+
+
+def bench_icon_manager(case):
+    from core.icon_manager import IconManager
+    icon_mgr = IconManager()
+    for r in case["topology"]["resources"]:
+        icon_mgr.get_icon_image(r["type"].lower(), 48, 48)
+
+
+def bench_render_preview(case):
+    from core.renderer_preview import generate_preview_file, PREVIEW_SCALE
+    check_canvas(case, PREVIEW_SCALE)
+    generate_preview_file(case["layout"], case["edges"], os.path.join(case["tmp"], "preview.png"))
+
+
+def bench_render_png(case):
+    check_canvas(case)
+    from core.renderer_img import generate_image_file
+    generate_image_file(case["layout"], case["edges"], os.path.join(case["tmp"], "topology.png"))
+
+
+def bench_render_pptx(case):
+    check_canvas(case)
+    from core.renderer_pptx import generate_pptx_file
+    generate_pptx_file(case["layout"], case["edges"], os.path.join(case["tmp"], "topology.pptx"))
+
+
+def bench_cold_start(case):
+    """Spawns the API server and waits for its first successful response."""
+    import uvicorn  # noqa: F401 (skip when the server dependencies are missing)
+
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+
+    # The server creates storage/ relative to its cwd, so keep it out of the repo
+    start = time.perf_counter()
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--app-dir", SERVER_DIR,
+         "--port", str(port), "--log-level", "warning"],
+        cwd=case["tmp"], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    try:
+        while time.perf_counter() - start < 60:
+            if proc.poll() is not None:
+                raise RuntimeError(f"server exited with code {proc.returncode}")
+            try:
+                with urllib.request.urlopen(f"http://127.0.0.1:{port}/metrics", timeout=1) as resp:
+                    if resp.status == 200:
+                        return
+            except (urllib.error.URLError, OSError):
+                time.sleep(0.01)
+        raise RuntimeError("server did not respond within 60s")
+    finally:
+        proc.terminate()
+        proc.wait()
+
+
+BENCHMARKS = {
+    "parse": bench_parse,
+    "layout": bench_layout,
+    "layout_aggregated": bench_layout_aggregated,
+    "icon_manager": bench_icon_manager,
+    "render_preview": bench_render_preview,
+    "render_png": bench_render_png,
+    "render_pptx": bench_render_pptx,
+}
+
+# Independent of topology size: run once per invocation, recorded under scale "server"
+SERVER_BENCHMARKS = {
+    "cold_start": bench_cold_start,
+}
+
+
+def prepare_case(scale, seed, tmp):
+    rg = "synthetic-rg"
+    raw = synthetic.generate_raw_resources(seed=seed, resource_group=rg, **synthetic.SCALES[scale])
+    topology = parser_module.parse_topology(raw, rg)
+    case = {"rg": rg, "raw": raw, "topology": topology, "tmp": tmp}
+
+    # Same layout as server/main.py process_topology
+    from core.layout import LayoutEngine, flatten_layout, AUTO_AGGREGATE_RESOURCES
+    engine = LayoutEngine(topology, aggregate=len(topology["resources"]) > AUTO_AGGREGATE_RESOURCES)
+    case["layout"] = engine.calculate_layout()
+    case["edges"] = engine.get_relationships()
+
+    # Canvas size and node count as seen by renderer_img.generate_image_file
+    drawn = flatten_layout(case["layout"])
+    case["drawn_nodes"] = len(drawn)
+    max_w = max((n['x'] + n['w'] for n in drawn), default=0)
+    max_h = max((n['y'] + n['h'] for n in drawn), default=0)
+    case["canvas_pixels"] = int(max_w + 200) * int(max_h + 200)
+    return case
+
+
+def run_one(func, case, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(case)
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def git_commit():
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT,
+                             capture_output=True, text=True, check=True)
+        return out.stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def load_history(path):
+    """Latest result per (scale, benchmark) from previous runs of the current benchmark versions."""
+    previous = {}
+    if not os.path.exists(path):
+        return previous
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            entry = json.loads(line)
+            if entry.get("version", 1) != BENCHMARK_VERSIONS.get(entry["benchmark"], 1):
+                continue
+            if entry.get("seconds") is not None:
+                previous[(entry["scale"], entry["benchmark"])] = entry
+    return previous
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the topology pipeline on synthetic data')
+    parser.add_argument('--scales', default='100,10k', help=f'Comma-separated presets from {sorted(synthetic.SCALES)}')
+    parser.add_argument('--only', help='Comma-separated benchmark names (default: all)')
+    parser.add_argument('--repeat', type=int, default=1, help='Runs per benchmark (min is reported)')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--results', default=DEFAULT_RESULTS, help='JSONL history file to append to')
+    parser.add_argument('--no-save', action='store_true', help='Do not append results to the history file')
+    args = parser.parse_args()
+
+    scales = [s.strip() for s in args.scales.split(',') if s.strip()]
+    names = [n.strip() for n in args.only.split(',')] if args.only else list(BENCHMARKS) + list(SERVER_BENCHMARKS)
+    for s in scales:
+        if s not in synthetic.SCALES:
+            parser.error(f"unknown scale: {s}")
+    for n in names:
+        if n not in BENCHMARKS and n not in SERVER_BENCHMARKS:
+            parser.error(f"unknown benchmark: {n}")
+
+    previous = load_history(args.results)
+    run_info = {
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+    }
+
+    results = []
+
+    def record(scale, name, func, case, resources, drawn_nodes=None):
+        try:
+            seconds = run_one(func, case, args.repeat)
+            shown = f"{seconds:10.4f}"
+        except (ImportError, SkipBenchmark) as e:
+            seconds = None
+            shown = f"{'skipped':>10}"
+            print(f"[WARN] {name}: {e}")
+
+        delta = ""
+        last = previous.get((scale, name))
+        if seconds is not None and last and last["seconds"]:
+            delta = f"{(seconds / last['seconds'] - 1) * 100:+7.1f}%"
+        print(f"{scale:>6}  {name:<20} {shown}  {delta:>8}")
+
+        results.append(dict(run_info, scale=scale, benchmark=name, version=BENCHMARK_VERSIONS.get(name, 1),
+                            resources=resources, drawn_nodes=drawn_nodes, repeat=args.repeat, seconds=seconds))
+
+    print(f"{'scale':>6}  {'benchmark':<20} {'seconds':>10}  {'vs last':>8}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for scale in scales:
+            case = prepare_case(scale, args.seed, tmp)
+            for name in names:
+                if name in BENCHMARKS:
+                    record(scale, name, BENCHMARKS[name], case, len(case["topology"]["resources"]), case["drawn_nodes"])
+
+        for name in names:
+            if name in SERVER_BENCHMARKS:
+                record("server", name, SERVER_BENCHMARKS[name], {"tmp": tmp}, None)
+
+    if not args.no_save:
+        os.makedirs(os.path.dirname(os.path.abspath(args.results)), exist_ok=True)
+        with open(args.results, 'a', encoding='utf-8') as f:
+            for r in results:
+                f.write(json.dumps(r) + "\n")
+        print(f"Results appended to {args.results}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+"""
+Synthetic Azure Topology Generator
+Generates a reproducible fake Resource Graph dump (and its parsed topology JSON)
+of arbitrary size, for benchmarking the parser, layout engine and renderers.
+"""
+
+import json
+import os
+import random
+import argparse
+import importlib.util
+
+
+# Resource counts per scale preset (see benchmarks/run_benchmarks.py)
+# parsed resources ~= vnets * (1 + subnets * (1 + 2 * vms)) + lbs + nsgs + public IPs
+SCALES = {
+    "100": {"vnets": 2, "subnets": 3, "vms": 6, "lbs": 2, "nsgs": 2, "public_ips": 4},
+    "10k": {"vnets": 10, "subnets": 10, "vms": 48, "lbs": 20, "nsgs": 20, "public_ips": 200},
+    "100k": {"vnets": 50, "subnets": 20, "vms": 49, "lbs": 100, "nsgs": 100, "public_ips": 1000},
+}
+
+
+def generate_raw_resources(vnets=2, subnets=3, vms=5, lbs=1, nsgs=1, public_ips=2,
+                           cross_links=0.1, seed=42, resource_group="synthetic-rg", location="koreacentral"):
+    """Returns a list of raw resources in `az graph query` format.
+
+    Every subnet gets `vms` NIC+VM pairs. Load balancers, NSGs and public IPs are
+    attached to random NICs/subnets; `cross_links` is the fraction of NICs that
+    additionally join a load balancer pool in another VNet.
+    """
+    rng = random.Random(seed)
+    prefix = f"/subscriptions/00000000-0000-0000-0000-000000000000/resourceGroups/{resource_group}/providers"
+    resources = []
+    subnet_ids = []
+    nic_ids = []       # [(nic_id, vnet_index)]
+
+    def resource(rtype, name, properties):
+        provider, kind = rtype.split('/', 1)
+        return {
+            "id": f"{prefix}/{provider}/{kind}/{name}",
+            "name": name,
+            "type": rtype,
+            "location": location,
+            "resourceGroup": resource_group,
+            "tags": {},
+            "properties": properties
+        }
+
+    for v in range(vnets):
+        vnet_name = f"vnet-{v:03d}"
+        vnet = resource("Microsoft.Network/virtualNetworks", vnet_name, {"subnets": []})
+        resources.append(vnet)
+
+        for s in range(subnets):
+            subnet_name = f"snet-{s:03d}"
+            subnet_id = f"{vnet['id']}/subnets/{subnet_name}"
+            subnet_ids.append(subnet_id)
+            vnet["properties"]["subnets"].append({
+                "id": subnet_id,
+                "name": subnet_name,
+                "properties": {"addressPrefix": f"10.{v % 256}.{s % 256}.0/24"}
+            })
+
+            for m in range(vms):
+                vm_name = f"vm-{v:03d}-{s:03d}-{m:04d}"
+                nic = resource("Microsoft.Network/networkInterfaces", f"{vm_name}-nic", {})
+                nic["properties"]["ipConfigurations"] = [{
+                    "id": f"{nic['id']}/ipConfigurations/ipconfig1",
+                    "properties": {"subnet": {"id": subnet_id}}
+                }]
+                vm = resource("Microsoft.Compute/virtualMachines", vm_name, {
+                    "networkProfile": {"networkInterfaces": [{"id": nic["id"]}]}
+                })
+                resources.append(nic)
+                resources.append(vm)
+                nic_ids.append((nic["id"], v))
+
+    for i in range(lbs):
+        lb = resource("Microsoft.Network/loadBalancers", f"lb-{i:03d}", {})
+        pool_id = f"{lb['id']}/backendAddressPools/pool1"
+        # Backend pool: NICs from one VNet, plus some cross-VNet members
+        home_vnet = i % max(vnets, 1)
+        members = [n for n, v in nic_ids if v == home_vnet]
+        members = rng.sample(members, min(len(members), 10))
+        others = [n for n, v in nic_ids if v != home_vnet]
+        if others and cross_links:
+            extra = int(len(members) * cross_links) + 1
+            members += rng.sample(others, min(len(others), extra))
+        lb["properties"]["backendAddressPools"] = [{
+            "id": pool_id,
+            "properties": {
+                "backendIPConfigurations": [{"id": f"{n}/ipConfigurations/ipconfig1"} for n in members]
+            }
+        }]
+        lb["properties"]["frontendIPConfigurations"] = [{"id": f"{lb['id']}/frontendIPConfigurations/fe1"}]
+        resources.append(lb)
+
+    for i in range(nsgs):
+        nsg = resource("Microsoft.Network/networkSecurityGroups", f"nsg-{i:03d}", {
+            "subnets": [{"id": sid} for sid in rng.sample(subnet_ids, min(len(subnet_ids), 3))],
+            "networkInterfaces": [{"id": n} for n, _ in rng.sample(nic_ids, min(len(nic_ids), 3))]
+        })
+        resources.append(nsg)
+
+    lb_ids = [r["id"] for r in resources if r["type"] == "Microsoft.Network/loadBalancers"]
+    for i in range(public_ips):
+        # Alternate between NIC and LB frontends
+        if lb_ids and i % 2:
+            linked = f"{rng.choice(lb_ids)}/frontendIPConfigurations/fe1"
+        elif nic_ids:
+            linked = f"{rng.choice(nic_ids)[0]}/ipConfigurations/ipconfig1"
+        else:
+            linked = None
+        resources.append(resource("Microsoft.Network/publicIPAddresses", f"pip-{i:04d}", {
+            "ipConfiguration": {"id": linked} if linked else None
+        }))
+
+    return resources
+
+
+def load_parser():
+    """Imports scripts/parse-relations.py (hyphenated, so not importable by name)."""
+    path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "parse-relations.py")
+    spec = importlib.util.spec_from_file_location("parse_relations", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Generate a synthetic Azure topology for benchmarking')
+    parser.add_argument('--scale', choices=sorted(SCALES), help='Preset size (overrides the individual counts)')
+    parser.add_argument('--vnets', type=int, default=2)
+    parser.add_argument('--subnets', type=int, default=3, help='Subnets per VNet')
+    parser.add_argument('--vms', type=int, default=5, help='NIC+VM pairs per subnet')
+    parser.add_argument('--lbs', type=int, default=1)
+    parser.add_argument('--nsgs', type=int, default=1)
+    parser.add_argument('--public-ips', type=int, default=2)
+    parser.add_argument('--cross-links', type=float, default=0.1, help='Fraction of LB pool members taken from other VNets')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--rg', default='synthetic-rg', help='Resource Group Name')
+    parser.add_argument('--raw', help='Output raw Resource Graph JSON file ({"data": [...]})')
+    parser.add_argument('--output', help='Output parsed topology JSON file')
+    args = parser.parse_args()
+
+    if not args.raw and not args.output:
+        parser.error("at least one of --raw / --output is required")
+
+    counts = SCALES[args.scale] if args.scale else {
+        "vnets": args.vnets, "subnets": args.subnets, "vms": args.vms,
+        "lbs": args.lbs, "nsgs": args.nsgs, "public_ips": args.public_ips
+    }
+    resources = generate_raw_resources(cross_links=args.cross_links, seed=args.seed,
+                                       resource_group=args.rg, **counts)
+    print(f"Generated {len(resources)} raw resources.")
+
+    if args.raw:
+        with open(args.raw, 'w', encoding='utf-8') as f:
+            json.dump({"data": resources, "skip_token": None}, f)
+        print(f"Raw data saved to {args.raw}")
+
+    if args.output:
+        topology = load_parser().parse_topology(resources, args.rg)
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(topology, f)
+        print(f"Topology saved to {args.output}")
+        print(f"  - {len(topology['resources'])} resources")
+        print(f"  - {len(topology['relationships'])} relationships")
+
+
+if __name__ == "__main__":
+    main()
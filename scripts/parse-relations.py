@@ -9,55 +9,20 @@ import sys
 import argparse
 
 
-def main():
-    parser = argparse.ArgumentParser(description='Parse Azure Resources to Topology JSON')
-    parser.add_argument('input_file', help='Input raw JSON file from az graph query')
-    parser.add_argument('output_file', help='Output topology JSON file')
-    parser.add_argument('--rg', help='Resource Group Name(s)', required=True)
-    args = parser.parse_args()
-
-    print(f"Parsing {args.input_file}...")
-
-    # Load raw data
-    try:
-        with open(args.input_file, 'r', encoding='utf-8') as f:
-            raw_data = json.load(f)
-    except FileNotFoundError:
-        print(f"[Error] File not found: {args.input_file}")
-        sys.exit(1)
-    except json.JSONDecodeError as e:
-        print(f"[Error] Invalid JSON: {e}")
-        sys.exit(1)
-
-    # Handle az graph query output format
-    # az graph query wraps results in: { "data": [...], "skip_token": null, ... }
-    if isinstance(raw_data, dict) and 'data' in raw_data:
-        resources = raw_data['data']
-    elif isinstance(raw_data, list):
-        resources = raw_data
-    else:
-        print(f"[Error] Unexpected data format: {type(raw_data)}")
-        resources = []
-
-    # Filter valid resources (must be dict with 'id' key)
-    valid_resources = [r for r in resources if isinstance(r, dict) and 'id' in r]
-    print(f"Loaded {len(valid_resources)} valid resources.")
-
-    if len(valid_resources) == 0:
-        print("[Warning] No valid resources to process.")
-
+def parse_topology(resources, resource_group):
+    """Builds topology JSON (resources + relationships) from raw Resource Graph resources."""
     # Initialize topology
     topology = {
-        "resourceGroup": args.rg,
+        "resourceGroup": resource_group,
         "resources": [],
         "relationships": []
     }
 
     # Build resource map for quick lookup
-    resource_map = {r['id'].lower(): r for r in valid_resources}
+    resource_map = {r['id'].lower(): r for r in resources}
 
     # Process resources
-    for r in valid_resources:
+    for r in resources:
         node = {
             "id": r.get('id', ''),
             "name": r.get('name', 'Unknown'),
@@ -71,7 +36,7 @@ def main():
     # Process relationships
     relationships = []
 
-    for r in valid_resources:
+    for r in resources:
         rid = r['id'].lower()
         rtype = r.get('type', '').lower()
         props = r.get('properties') or {}
@@ -186,6 +151,48 @@ def main():
 
     topology["relationships"] = relationships
 
+    return topology
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Parse Azure Resources to Topology JSON')
+    parser.add_argument('input_file', help='Input raw JSON file from az graph query')
+    parser.add_argument('output_file', help='Output topology JSON file')
+    parser.add_argument('--rg', help='Resource Group Name(s)', required=True)
+    args = parser.parse_args()
+
+    print(f"Parsing {args.input_file}...")
+
+    # Load raw data
+    try:
+        with open(args.input_file, 'r', encoding='utf-8') as f:
+            raw_data = json.load(f)
+    except FileNotFoundError:
+        print(f"[Error] File not found: {args.input_file}")
+        sys.exit(1)
+    except json.JSONDecodeError as e:
+        print(f"[Error] Invalid JSON: {e}")
+        sys.exit(1)
+
+    # Handle az graph query output format
+    # az graph query wraps results in: { "data": [...], "skip_token": null, ... }
+    if isinstance(raw_data, dict) and 'data' in raw_data:
+        resources = raw_data['data']
+    elif isinstance(raw_data, list):
+        resources = raw_data
+    else:
+        print(f"[Error] Unexpected data format: {type(raw_data)}")
+        resources = []
+
+    # Filter valid resources (must be dict with 'id' key)
+    valid_resources = [r for r in resources if isinstance(r, dict) and 'id' in r]
+    print(f"Loaded {len(valid_resources)} valid resources.")
+
+    if len(valid_resources) == 0:
+        print("[Warning] No valid resources to process.")
+
+    topology = parse_topology(valid_resources, args.rg)
+
     # Write output
     with open(args.output_file, 'w', encoding='utf-8') as f:
         json.dump(topology, f, indent=2, ensure_ascii=False)
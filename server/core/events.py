@@ -0,0 +1,63 @@
+import asyncio
+from typing import Dict, Any, AsyncIterator, Optional
+
+# Event types, in pipeline order. "done" / "error" end the stream.
+TERMINAL_EVENTS = {"done", "error"}
+
+# How long a finished job's events stay in memory for late subscribers
+RETENTION_SECONDS = 300
+
+# Job ID -> {"history": [event], "subscribers": {asyncio.Queue}}
+_channels: Dict[str, Dict[str, Any]] = {}
+
+
+def open_channel(job_id: str):
+    _channels.setdefault(job_id, {"history": [], "subscribers": set()})
+
+
+def has_channel(job_id: str) -> bool:
+    return job_id in _channels
+
+
+def publish(job_id: str, event: Dict[str, Any]):
+    """Sends an event ({"type": ..., ...}) to every subscriber. Must run on the event loop."""
+    channel = _channels.get(job_id)
+    if channel is None:
+        return
+    channel["history"].append(event)
+    for queue in channel["subscribers"]:
+        queue.put_nowait(event)
+
+    if event["type"] in TERMINAL_EVENTS:
+        asyncio.get_running_loop().call_later(RETENTION_SECONDS, _channels.pop, job_id, None)
+
+
+async def subscribe(job_id: str, keepalive: Optional[float] = None) -> AsyncIterator[Optional[Dict[str, Any]]]:
+    """Yields past events, then live ones, until a terminal event.
+
+    With `keepalive`, yields None whenever no event arrived for that many seconds.
+    """
+    channel = _channels.get(job_id)
+    if channel is None:
+        return
+
+    queue = asyncio.Queue()
+    # Snapshot history and register in one step (no await in between)
+    backlog = list(channel["history"])
+    channel["subscribers"].add(queue)
+    try:
+        for event in backlog:
+            yield event
+            if event["type"] in TERMINAL_EVENTS:
+                return
+        while True:
+            try:
+                event = await asyncio.wait_for(queue.get(), keepalive)
+            except asyncio.TimeoutError:
+                yield None
+                continue
+            yield event
+            if event["type"] in TERMINAL_EVENTS:
+                return
+    finally:
+        channel["subscribers"].discard(queue)
@@ -4,15 +4,35 @@ from svglib.svglib import svg2rlg
 from reportlab.graphics import renderPM
 from PIL import Image
 import io
+import time
+import threading
+from . import metrics
 
 # Valid absolute path to icons
 ICON_ROOT = r"C:\Users\asomi\OneDrive - 엘던솔루션\작업용\Azure Resource Topology Auto-Generator\Azure_Public_Service_Icons\Icons"
 
+# Resource types rasterized ahead of time by warmup() (most topologies are made of these)
+COMMON_ICON_TYPES = [
+    "microsoft.network/virtualnetworks",
+    "microsoft.network/virtualnetworks/subnets",
+    "microsoft.network/networkinterfaces",
+    "microsoft.compute/virtualmachines",
+    "microsoft.network/loadbalancers",
+    "microsoft.network/networksecuritygroups",
+    "microsoft.network/publicipaddresses",
+]
+# Sizes requested by the renderers (PNG: 48, PPTX: 64)
+COMMON_ICON_SIZES = [48, 64]
+
+_shared_manager = None
+_shared_lock = threading.Lock()
+
 class IconManager:
     def __init__(self):
         self.icon_cache = {}
         self.path_map = {} # keys normalized -> full path
-        self._build_icon_map()
+        with metrics.stage("icon_scan"):
+            self._build_icon_map()
 
     def _build_icon_map(self):
         """Recursively scans ICON_ROOT and builds a normalized map."""
@@ -93,13 +113,17 @@ class IconManager:
         """Returns a PIL Image object (PNG format)"""
         cache_key = f"{resource_type}_{width}x{height}"
         if cache_key in self.icon_cache:
+            metrics.inc("icon_cache_hits_total")
             return self.icon_cache[cache_key]
+        metrics.inc("icon_cache_misses_total")
             
         svg_path = self.get_icon_path(resource_type)
         if not svg_path or not os.path.exists(svg_path):
             print(f"[WARN] No icon found for {resource_type}")
+            metrics.inc("icon_missing_total")
             return self._create_placeholder(width, height)
             
+        start = time.perf_counter()
         try:
             drawing = svg2rlg(svg_path)
             
@@ -129,9 +153,31 @@ class IconManager:
             
         except Exception as e:
             print(f"[ERR] Failed to convert {svg_path}: {e}")
+            metrics.inc("icon_rasterize_errors_total")
             return self._create_placeholder(width, height)
+        finally:
+            metrics.observe("icon_rasterize", time.perf_counter() - start)
 
     def _create_placeholder(self, w, h):
         # Create a semi-transparent gray box with ? mark
         img = Image.new('RGBA', (w, h), (200, 200, 200, 128))
         return img
+
+
+def get_icon_manager() -> IconManager:
+    """Process-wide IconManager, so the icon directory walk and rasterized icons are shared across jobs."""
+    global _shared_manager
+    if _shared_manager is None:
+        with _shared_lock:
+            if _shared_manager is None:
+                _shared_manager = IconManager()
+    return _shared_manager
+
+
+def warmup():
+    """Builds the shared icon map and rasterizes COMMON_ICON_TYPES into its cache."""
+    with metrics.stage("icon_warmup"):
+        icon_mgr = get_icon_manager()
+        for res_type in COMMON_ICON_TYPES:
+            for size in COMMON_ICON_SIZES:
+                icon_mgr.get_icon_image(res_type, size, size)
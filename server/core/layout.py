@@ -7,21 +7,71 @@ PADDING = 40
 LABEL_HEIGHT = 20
 Grid_Columns = 4
 
+# Constants for Aggregation (Level-of-detail)
+AGGREGATE_THRESHOLD = 10        # Min. identical siblings before they collapse into one summary node
+AUTO_AGGREGATE_RESOURCES = 500  # Topologies bigger than this aggregate by default
+
+# NIC -> VM relationship types ("AttachedTo" is what scripts/parse-relations.py emits)
+NIC_VM_RELATIONSHIPS = ("NICAttachedToVM", "AttachedTo")
+
+# Plural labels for summary nodes ("37 VMs"). Unknown types fall back to the raw type name.
+SUMMARY_LABELS = {
+    "virtualmachines": "VMs",
+    "networkinterfaces": "NICs",
+    "publicipaddresses": "Public IPs",
+    "networksecuritygroups": "NSGs",
+    "loadbalancers": "Load Balancers",
+    "disks": "Disks",
+}
+
+def flatten_layout(nodes):
+    """Every node of a calculate_layout tree, parents before their children (drawing order).
+
+    Coordinates are absolute, so renderers can draw the flat list as-is; nodes
+    with children are containers (VNet, Subnet, NIC+VM) drawn as frames.
+    """
+    flat = []
+    stack = list(reversed(nodes))
+    while stack:
+        node = stack.pop()
+        flat.append(node)
+        stack.extend(reversed(node['children']))
+    return flat
+
 class LayoutEngine:
-    def __init__(self, topology: Dict[str, Any]):
+    def __init__(self, topology: Dict[str, Any], aggregate: bool = False, aggregate_threshold: int = AGGREGATE_THRESHOLD):
         self.topology = topology
         self.resources = topology.get("resources", [])
         self.relationships = topology.get("relationships", [])
         
+        # Aggregation: collapse homogeneous sibling groups into "37 VMs" style summary nodes
+        self.aggregate = aggregate
+        self.aggregate_threshold = max(2, aggregate_threshold)
+        # Member ResourceID (lower) -> Summary node ID. Filled by calculate_layout.
+        self.aggregate_map = {}
+        
         # Output: Map of ResourceID -> {x, y, w, h, parentId, children: []}
         self.layout_map = {}
         
+        # Indexes (built once, so lookups do not rescan the whole topology)
+        # ResourceID (lower) -> resource
+        self.resource_index = {}
+        # Type (lower) -> [resource]
+        self.type_index = {}
+        for r in self.resources:
+            self.resource_index.setdefault(r['id'].lower(), r)
+            self.type_index.setdefault(r['type'].lower(), []).append(r)
+        # (From ID (lower), Relationship type) -> [To ID]
+        self.children_index = {}
+        for rel in self.relationships:
+            self.children_index.setdefault((rel['from'].lower(), rel['type']), []).append(rel['to'])
+        
     def calculate_layout(self):
         # 1. Structure the data hierarchically
         # VNet -> Subnet -> Resources
         # Others (orphans)
         
-        vnets = [r for r in self.resources if r['type'].lower() == 'microsoft.network/virtualnetworks']
+        vnets = self.type_index.get('microsoft.network/virtualnetworks', [])
         processed_ids = set()
         
         # We will build a tree structure for layout calculation
@@ -59,8 +109,10 @@ class LayoutEngine:
                              processed_ids.add(nic_id.lower())
                              
                              # Find VMs attached to this NIC
-                             # Parser: "from: nic, to: vm, type: NICAttachedToVM"
-                             vm_ids = self._find_children(nic_id, "NICAttachedToVM", None)
+                             # Parser: "from: nic, to: vm, type: AttachedTo"
+                             vm_ids = []
+                             for rel_type in NIC_VM_RELATIONSHIPS:
+                                 vm_ids.extend(self._find_children(nic_id, rel_type, None))
                              for vm_id in vm_ids:
                                  vm_res = self._find_resource(vm_id)
                                  if vm_res:
@@ -70,15 +122,29 @@ class LayoutEngine:
                                       
                              sn_node['children'].append(nic_node)
                      
+                     if self.aggregate:
+                         sn_node['children'] = self._aggregate_nodes(sn_node['children'], sn_node['id'])
+                     
                      v_node['children'].append(sn_node)
             
             root_nodes.append(v_node)
             
         # Handle Orphans (Not processed yet)
         # e.g. Random LBs, Public IPs not linked yet
-        for r in self.resources:
-            if r['id'].lower() not in processed_ids:
-                root_nodes.append(self._build_node(r))
+        if self.aggregate:
+            # Orphans have no children, so the type index already holds the groups
+            # e.g. VMSS instances, dozens of Public IPs
+            rg = self.topology.get("resourceGroup", "")
+            for members in self.type_index.values():
+                orphans = [self._build_node(r) for r in members if r['id'].lower() not in processed_ids]
+                if len(orphans) >= self.aggregate_threshold:
+                    root_nodes.append(self._build_summary_node(orphans, rg))
+                else:
+                    root_nodes.extend(orphans)
+        else:
+            for r in self.resources:
+                if r['id'].lower() not in processed_ids:
+                    root_nodes.append(self._build_node(r))
                 
         # 2. Calculate coordinates (Recursively)
         current_y = 0
@@ -103,23 +169,108 @@ class LayoutEngine:
 
     def _find_children(self, parent_id, rel_type, child_type_filter):
         children = []
-        for rel in self.relationships:
-            if rel['from'].lower() == parent_id.lower() and rel['type'] == rel_type:
-                # Optional type check
-                if child_type_filter:
-                    # Look up the target resource to check type
-                    target = self._find_resource(rel['to'])
-                    if target and target['type'].lower() == child_type_filter.lower():
-                        children.append(rel['to'])
-                else:
-                    children.append(rel['to'])
+        for to_id in self.children_index.get((parent_id.lower(), rel_type), []):
+            # Optional type check
+            if child_type_filter:
+                # Look up the target resource to check type
+                target = self._find_resource(to_id)
+                if target and target['type'].lower() == child_type_filter.lower():
+                    children.append(to_id)
+            else:
+                children.append(to_id)
         return children
 
     def _find_resource(self, rid):
-        for r in self.resources:
-            if r['id'].lower() == rid.lower():
-                return r
-        return None
+        return self.resource_index.get(rid.lower())
+
+    def _aggregate_nodes(self, nodes, parent_id):
+        """Collapses groups of >= aggregate_threshold homogeneous sibling nodes into one summary node.
+
+        Siblings are homogeneous when they share a type and the same child types
+        (e.g. NIC+VM pairs). The summary node takes the type of the most specific
+        member (the VM for NIC+VM pairs) so the renderers pick a meaningful icon.
+        """
+        signatures = [
+            (node['type'].lower(), tuple(sorted(c['type'].lower() for c in node['children'])))
+            for node in nodes
+        ]
+        groups = {}
+        for node, signature in zip(nodes, signatures):
+            groups.setdefault(signature, []).append(node)
+
+        result = []
+        emitted = set()
+        for node, signature in zip(nodes, signatures):
+            members = groups[signature]
+            if len(members) < self.aggregate_threshold:
+                result.append(node)
+                continue
+            if signature in emitted:
+                continue
+            emitted.add(signature)
+            result.append(self._build_summary_node(members, parent_id))
+        return result
+
+    def _build_summary_node(self, members, parent_id):
+        # Flatten NIC -> VM so every collapsed resource maps onto the summary
+        member_ids = []
+        stack = list(members)
+        while stack:
+            m = stack.pop()
+            member_ids.append(m['id'])
+            stack.extend(m['children'])
+
+        # Display type: deepest child type (VM for NIC+VM pairs), else the member type
+        display_type = members[0]['type']
+        first = members[0]
+        while first['children']:
+            first = first['children'][0]
+            display_type = first['type']
+
+        type_name = display_type.split('/')[-1]
+        label = SUMMARY_LABELS.get(type_name.lower(), type_name)
+        summary_id = f"{parent_id}/aggregate/{display_type.lower()}/{members[0]['type'].lower()}"
+
+        for mid in member_ids:
+            self.aggregate_map[mid.lower()] = summary_id
+
+        resource = {
+            "id": summary_id,
+            "name": f"{len(members)} {label}",
+            "type": display_type,
+            "properties": {
+                "aggregatedCount": len(members),
+                "aggregatedIds": member_ids
+            }
+        }
+        node = self._build_node(resource)
+        node['aggregate'] = {"count": len(members), "members": member_ids}
+        return node
+
+    def get_relationships(self):
+        """Relationships rewritten onto summary nodes (duplicates and self-loops dropped).
+
+        Returns the original relationships untouched when nothing was aggregated.
+        """
+        if not self.aggregate_map:
+            return self.relationships
+
+        seen = set()
+        edges = []
+        for rel in self.relationships:
+            src = self.aggregate_map.get(rel['from'].lower(), rel['from'])
+            dst = self.aggregate_map.get(rel['to'].lower(), rel['to'])
+            if src.lower() == dst.lower():
+                continue
+            key = (src.lower(), dst.lower(), rel['type'])
+            if key in seen:
+                continue
+            seen.add(key)
+            edge = dict(rel)
+            edge['from'] = src
+            edge['to'] = dst
+            edges.append(edge)
+        return edges
 
     def _layout_node_recursive(self, node, x_offset, y_offset):
         # If leaf node
@@ -140,11 +291,14 @@ class LayoutEngine:
         
         cols = 0
         row_h = 0
+        # Right edge of the widest row (cur_x resets on every new row)
+        max_x = cur_x
         
         for child in node['children']:
             cw, ch = self._layout_node_recursive(child, cur_x, cur_y)
             
             cur_x += cw + PADDING
+            max_x = max(max_x, cur_x)
             row_h = max(row_h, ch)
             cols += 1
             
@@ -155,7 +309,7 @@ class LayoutEngine:
                 row_h = 0
                 
         # Final dimensions for this container
-        width = max((ICON_WIDTH + PADDING) * Grid_Columns, cur_x - x_offset) + PADDING
+        width = max((ICON_WIDTH + PADDING) * Grid_Columns, max_x - x_offset) + PADDING
         if cols == 0 and len(node['children']) > 0: # Just finished a row
              height = cur_y
         else:
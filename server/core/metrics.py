@@ -0,0 +1,134 @@
+import sys
+import time
+import threading
+import contextvars
+from contextlib import contextmanager
+from typing import Dict, Any, Optional
+
+try:
+    import resource  # Unix only
+except ImportError:
+    resource = None
+
+# Process-wide metric storage (exposed on /metrics in Prometheus text format)
+# Counter: name -> value
+_counters: Dict[str, float] = {}
+# Gauge: name -> value
+_gauges: Dict[str, float] = {}
+# Stage timer: stage -> {"count": n, "sum": seconds, "max": seconds}
+_stages: Dict[str, Dict[str, float]] = {}
+_lock = threading.Lock()
+
+# Per-job collector (set by job_metrics(), picked up by stage()/inc()/set_gauge())
+_current_job: contextvars.ContextVar = contextvars.ContextVar("current_job", default=None)
+
+METRIC_PREFIX = "topology_"
+
+
+def inc(name: str, value: float = 1):
+    """Increments a counter (e.g. icon_cache_hits_total)."""
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + value
+    job = _current_job.get()
+    if job is not None:
+        job["counters"][name] = job["counters"].get(name, 0) + value
+
+
+def set_gauge(name: str, value: float):
+    with _lock:
+        _gauges[name] = value
+    job = _current_job.get()
+    if job is not None:
+        job["gauges"][name] = value
+
+
+def observe(stage_name: str, seconds: float):
+    with _lock:
+        s = _stages.setdefault(stage_name, {"count": 0, "sum": 0.0, "max": 0.0})
+        s["count"] += 1
+        s["sum"] += seconds
+        s["max"] = max(s["max"], seconds)
+    job = _current_job.get()
+    if job is not None:
+        job["stages"][stage_name] = job["stages"].get(stage_name, 0.0) + seconds
+
+
+@contextmanager
+def stage(stage_name: str):
+    """Times a pipeline stage: `with metrics.stage("layout"): ...`"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe(stage_name, time.perf_counter() - start)
+
+
+def process_peak_rss_bytes() -> Optional[int]:
+    """Peak RSS of the whole process since it started (never resets), or None where unavailable.
+
+    This is a process high-water mark, not a per-job figure: jobs run concurrently
+    and share the process, so a job's value is only an upper bound for that job.
+    """
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS bytes
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+@contextmanager
+def job_metrics(request_id: str):
+    """Collects everything recorded inside the block into a per-job dict."""
+    job = {"requestId": request_id, "stages": {}, "counters": {}, "gauges": {}}
+    token = _current_job.set(job)
+    start = time.perf_counter()
+    try:
+        yield job
+    finally:
+        job["totalSeconds"] = time.perf_counter() - start
+        # Process-wide high-water mark at the end of the job (see process_peak_rss_bytes)
+        peak = process_peak_rss_bytes()
+        if peak is not None:
+            job["gauges"]["process_peak_rss_bytes"] = peak
+            set_gauge("process_peak_rss_bytes", peak)
+        _current_job.reset(token)
+
+
+def snapshot() -> Dict[str, Any]:
+    with _lock:
+        return {
+            "counters": dict(_counters),
+            "gauges": dict(_gauges),
+            "stages": {k: dict(v) for k, v in _stages.items()},
+        }
+
+
+def render_prometheus() -> str:
+    """Renders all metrics in the Prometheus text exposition format."""
+    data = snapshot()
+    lines = []
+
+    for name, value in sorted(data["counters"].items()):
+        metric = METRIC_PREFIX + name
+        lines.append(f"# TYPE {metric} counter")
+        lines.append(f"{metric} {value}")
+
+    peak = process_peak_rss_bytes()
+    if peak is not None:
+        data["gauges"]["process_peak_rss_bytes"] = peak
+    for name, value in sorted(data["gauges"].items()):
+        metric = METRIC_PREFIX + name
+        lines.append(f"# TYPE {metric} gauge")
+        lines.append(f"{metric} {value}")
+
+    if data["stages"]:
+        metric = METRIC_PREFIX + "stage_seconds"
+        lines.append(f"# TYPE {metric} summary")
+        for name, s in sorted(data["stages"].items()):
+            lines.append(f'{metric}_count{{stage="{name}"}} {s["count"]}')
+            lines.append(f'{metric}_sum{{stage="{name}"}} {s["sum"]}')
+        lines.append(f"# TYPE {metric}_max gauge")
+        for name, s in sorted(data["stages"].items()):
+            lines.append(f'{metric}_max{{stage="{name}"}} {s["max"]}')
+
+    return "\n".join(lines) + "\n"
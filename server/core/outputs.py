@@ -0,0 +1,43 @@
+import os
+import gzip
+import hashlib
+import shutil
+
+# Per-job manifest: filename -> {"sha256", "size", "gzip", "gzipSize"}. A file is only
+# listed once it is completely stored, so listed files never change afterwards.
+MANIFEST_NAME = "manifest.json"
+
+# Text formats get a precompressed .gz sibling (PNG/PPTX are already compressed)
+COMPRESSIBLE_EXTENSIONS = {".svg", ".json", ".txt", ".html", ".csv"}
+
+CHUNK_SIZE = 64 * 1024
+
+
+def file_sha256(path):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def prepare_output(path):
+    """Hashes a finished local file and precompresses text formats next to it.
+
+    Returns the manifest entry and the path of the .gz variant (or None).
+    """
+    entry = {
+        "sha256": file_sha256(path),
+        "size": os.path.getsize(path),
+        "gzip": False
+    }
+    gz_path = None
+
+    if os.path.splitext(path)[1].lower() in COMPRESSIBLE_EXTENSIONS:
+        gz_path = path + ".gz"
+        with open(path, "rb") as src, gzip.open(gz_path, "wb", compresslevel=9) as dst:
+            shutil.copyfileobj(src, dst)
+        entry["gzip"] = True
+        entry["gzipSize"] = os.path.getsize(gz_path)
+
+    return entry, gz_path
@@ -1,17 +1,30 @@
 from PIL import Image, ImageDraw, ImageFont
 import os
-from .icon_manager import IconManager
+from .icon_manager import get_icon_manager
+from .layout import flatten_layout
+from . import metrics
+
+# Containers (VNet, Subnet, NIC with its VM) are frames with a small icon + name in the header
+FRAME_ICON_SIZE = 32
+FRAME_COLOR = (160, 160, 160)
+
+def _anchor(node):
+    # Edge end point: icon centre (header icon for containers)
+    if node['children']:
+        return node['x'] + 8 + FRAME_ICON_SIZE/2, node['y'] + 8 + FRAME_ICON_SIZE/2
+    return node['x'] + node['w']/2, node['y'] + node['h']/2
 
 def generate_image_file(layout_nodes, relationships, output_path):
     # 0. Init Icon Manager
-    icon_mgr = IconManager()
+    icon_mgr = get_icon_manager()
 
-    # 1. Calculate Canvas Size & Map
-    node_map = {n['id'].lower(): n for n in layout_nodes}
+    # 1. Calculate Canvas Size & Map (whole tree: coordinates are absolute)
+    nodes = flatten_layout(layout_nodes)
+    node_map = {n['id'].lower(): n for n in nodes}
     
     max_w = 0
     max_h = 0
-    for n in layout_nodes:
+    for n in nodes:
         r = n['x'] + n['w']
         b = n['y'] + n['h']
         if r > max_w: max_w = r
@@ -31,7 +44,13 @@ def generate_image_file(layout_nodes, relationships, output_path):
         font = ImageFont.load_default()
         title_font = ImageFont.load_default()
     
-    # Draw Lines (Edges) FIRST (so they are behind icons)
+    # Draw Frames FIRST (parents before children, so nested frames stay visible)
+    for node in nodes:
+        if node['children']:
+            draw.rectangle([node['x'], node['y'], node['x'] + node['w'], node['y'] + node['h']],
+                           outline=FRAME_COLOR, width=1)
+    
+    # Draw Lines (Edges) next (so they are behind icons)
     for rel in relationships:
         src_id = rel['from'].lower()
         dst_id = rel['to'].lower()
@@ -40,11 +59,8 @@ def generate_image_file(layout_nodes, relationships, output_path):
             src = node_map[src_id]
             dst = node_map[dst_id]
             
-            # Center points
-            x1 = src['x'] + src['w']/2
-            y1 = src['y'] + src['h']/2
-            x2 = dst['x'] + dst['w']/2
-            y2 = dst['y'] + dst['h']/2
+            x1, y1 = _anchor(src)
+            x2, y2 = _anchor(dst)
             
             category = rel.get('category', 'Physical')
             
@@ -69,10 +85,21 @@ def generate_image_file(layout_nodes, relationships, output_path):
                 draw.ellipse([x2-3, y2-3, x2+3, y2+3], fill=color)
 
     # Draw Nodes (Icons)
-    for node in layout_nodes:
+    for node in nodes:
         x, y, w, h = node['x'], node['y'], node['w'], node['h']
         res_type = node['resource']['type'].lower()
         
+        if node['children']:
+            # Container header: icon top-left, name next to it
+            icon = icon_mgr.get_icon_image(res_type, FRAME_ICON_SIZE, FRAME_ICON_SIZE)
+            if icon:
+                im.paste(icon, (int(x + 8), int(y + 8)), icon)
+            else:
+                draw.rectangle([x + 8, y + 8, x + 8 + FRAME_ICON_SIZE, y + 8 + FRAME_ICON_SIZE], fill=(200,200,200))
+            draw.text((x + FRAME_ICON_SIZE + 16, y + 8 + FRAME_ICON_SIZE/2 - 6), node['resource']['name'],
+                      fill=(0,0,0), font=title_font)
+            continue
+        
         # Icon Size
         target_size = 48
         
@@ -103,4 +130,5 @@ def generate_image_file(layout_nodes, relationships, output_path):
         # type_short = res_type.split('/')[-1]
         # draw.text((x, iy + target_size + 15), type_short, fill=(100,100,100), font=font)
 
-    im.save(output_path)
+    with metrics.stage("png_save"):
+        im.save(output_path)
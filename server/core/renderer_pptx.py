@@ -2,19 +2,21 @@ from pptx import Presentation
 from pptx.util import Inches, Pt, Cm
 from pptx.enum.shapes import MSO_CONNECTOR
 from pptx.dml.color import RGBColor
-from .icon_manager import IconManager
+from .icon_manager import get_icon_manager
+from .layout import flatten_layout
+from . import metrics
 import os
 import tempfile
 
 def generate_pptx_file(layout_nodes, relationships, output_path):
-    icon_mgr = IconManager()
+    icon_mgr = get_icon_manager()
     prs = Presentation()
     slide = prs.slides.add_slide(prs.slide_layouts[6]) # Blank Layout
     
     shape_map = {}
     
-    # 1. Draw Nodes (Icons)
-    for node in layout_nodes:
+    # 1. Draw Nodes (Icons). Whole tree, parents first so frames stay behind their children.
+    for node in flatten_layout(layout_nodes):
         x_cm = Cm(node['x'] / 30.0)
         y_cm = Cm(node['y'] / 30.0)
         w_cm = Cm(node['w'] / 30.0)
@@ -24,6 +26,33 @@ def generate_pptx_file(layout_nodes, relationships, output_path):
         # Get Icon
         icon_img = icon_mgr.get_icon_image(res_type, 64, 64)
         
+        if node['children']:
+            # Container (VNet, Subnet, NIC+VM): frame, small icon + name in the header
+            frame = slide.shapes.add_shape(1, x_cm, y_cm, w_cm, Cm(node['h'] / 30.0))  # 1=Rectangle
+            frame.fill.background()
+            frame.line.color.rgb = RGBColor(160, 160, 160)
+            frame.line.width = Pt(0.75)
+            
+            icon_size = Cm(1)
+            ix = x_cm + Cm(0.25)
+            iy = y_cm + Cm(0.25)
+            if icon_img:
+                with tempfile.NamedTemporaryFile(suffix=".png", delete=False) as tmp:
+                    icon_img.save(tmp.name)
+                    tmp_path = tmp.name
+                shape = slide.shapes.add_picture(tmp_path, ix, iy, width=icon_size, height=icon_size)
+                os.remove(tmp_path)
+            else:
+                shape = slide.shapes.add_shape(5, ix, iy, icon_size, icon_size)
+                shape.fill.solid()
+                shape.fill.fore_color.rgb = RGBColor(200, 200, 200)
+            shape_map[node['id'].lower()] = shape
+            
+            label = slide.shapes.add_textbox(ix + icon_size + Cm(0.2), iy, w_cm - icon_size - Cm(0.7), icon_size)
+            label.text_frame.text = node['resource']['name']
+            label.text_frame.paragraphs[0].font.size = Pt(10)
+            continue
+        
         shape = None
         if icon_img:
             # Save dump
@@ -96,4 +125,5 @@ def generate_pptx_file(layout_nodes, relationships, output_path):
                  line.width = Pt(1)
                  line.dash_style = 4 # SquareDot
 
-    prs.save(output_path)
+    with metrics.stage("pptx_save"):
+        prs.save(output_path)
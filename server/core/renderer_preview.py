@@ -0,0 +1,76 @@
+from PIL import Image, ImageDraw, ImageFont
+from .layout import flatten_layout
+from . import metrics
+
+# Preview is drawn at a fraction of the full PNG size, without icons
+PREVIEW_SCALE = 0.5
+
+def _anchor(node, scale):
+    # Edge end point: box centre (header box for containers), as in renderer_img
+    if node['children']:
+        return node['x'] * scale + 4 + 16 * scale, node['y'] * scale + 4 + 16 * scale
+    return (node['x'] + node['w'] / 2) * scale, (node['y'] + node['h'] / 2) * scale
+
+def generate_preview_file(layout_nodes, relationships, output_path, scale=PREVIEW_SCALE):
+    """Fast low-fidelity PNG: same layout as generate_image_file, boxes and labels only."""
+    # 1. Calculate Canvas Size & Map (whole tree: coordinates are absolute)
+    nodes = flatten_layout(layout_nodes)
+    node_map = {n['id'].lower(): n for n in nodes}
+
+    max_w = 0
+    max_h = 0
+    for n in nodes:
+        max_w = max(max_w, n['x'] + n['w'])
+        max_h = max(max_h, n['y'] + n['h'])
+
+    width = max(int((max_w + 200) * scale), 1)
+    height = max(int((max_h + 200) * scale), 1)
+
+    # 2. Draw
+    im = Image.new('RGB', (width, height), (255, 255, 255))
+    draw = ImageDraw.Draw(im)
+    font = ImageFont.load_default()  # No font file lookup
+
+    # Container frames (parents first)
+    for node in nodes:
+        if node['children']:
+            draw.rectangle([node['x'] * scale, node['y'] * scale,
+                            (node['x'] + node['w']) * scale, (node['y'] + node['h']) * scale],
+                           outline=(160, 160, 160))
+
+    # Edges (same colours as the full render)
+    for rel in relationships:
+        src = node_map.get(rel['from'].lower())
+        dst = node_map.get(rel['to'].lower())
+        if not src or not dst:
+            continue
+
+        category = rel.get('category', 'Physical')
+        color = (150, 150, 150)
+        if category == 'Traffic':
+            color = (0, 180, 0)
+        elif category == 'Association':
+            color = (255, 140, 0)
+        elif category == 'Physical':
+            color = (0, 120, 212)
+
+        draw.line([*_anchor(src, scale), *_anchor(dst, scale)], fill=color, width=1)
+
+    # Nodes: a box where the icon goes, name below (containers: header box, name next to it)
+    box = 48 * scale
+    for node in nodes:
+        x, y, w = node['x'] * scale, node['y'] * scale, node['w'] * scale
+        if node['children']:
+            header = 32 * scale
+            draw.rectangle([x + 4, y + 4, x + 4 + header, y + 4 + header], fill=(222, 236, 249), outline=(0, 120, 212))
+            draw.text((x + header + 8, y + 4), node['resource']['name'], fill=(0, 0, 0), font=font)
+            continue
+        bx = x + (w - box) / 2
+        draw.rectangle([bx, y, bx + box, y + box], fill=(222, 236, 249), outline=(0, 120, 212))
+
+        text = node['resource']['name']
+        if len(text) > 15: text = text[:12] + "..."
+        draw.text((x, y + box + 2), text, fill=(0, 0, 0), font=font)
+
+    with metrics.stage("preview_save"):
+        im.save(output_path, compress_level=1)  # Speed over size
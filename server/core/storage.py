@@ -0,0 +1,378 @@
+import os
+import re
+import json
+import time
+import uuid
+import shutil
+import threading
+from abc import ABC, abstractmethod
+from typing import List, Dict, Any, Optional, BinaryIO
+
+from . import metrics
+from .outputs import MANIFEST_NAME, prepare_output
+
+# Job objects (stored next to the outputs)
+INPUT_NAME = "input.json"
+JOB_META_NAME = "job.json"
+ACCESS_MARKER_NAME = ".access"  # mtime = last download (LRU)
+
+# Job IDs are UUIDs; anything else could escape the storage root
+JOB_ID_PATTERN = re.compile(r"^[A-Za-z0-9-]{8,64}$")
+# Object names are plain file names (no directories)
+OBJECT_NAME_PATTERN = re.compile(r"^[A-Za-z0-9._-]{1,128}$")
+
+
+def _check_name(name: str):
+    if not OBJECT_NAME_PATTERN.match(name) or name in (".", ".."):
+        raise ValueError(f"Invalid object name: {name!r}")
+
+
+class StorageBackend(ABC):
+    """Where job objects live: a flat set of named objects per job ID.
+
+    Writes are whole-object and atomic (readers see the old object or the new
+    one, never a partial one), which maps onto both a local directory and blob
+    storage (one container prefix per job).
+    """
+
+    @abstractmethod
+    def create_job(self, job_id: str):
+        pass
+
+    @abstractmethod
+    def job_exists(self, job_id: str) -> bool:
+        pass
+
+    @abstractmethod
+    def list_jobs(self) -> List[Dict[str, Any]]:
+        """All jobs as dicts: jobId, size (bytes), createdAt, lastAccess, ttlSeconds (from job.json)."""
+
+    @abstractmethod
+    def delete_job(self, job_id: str):
+        pass
+
+    @abstractmethod
+    def touch(self, job_id: str, when: Optional[float] = None):
+        """Records an access (for LRU eviction)."""
+
+    @abstractmethod
+    def put_bytes(self, job_id: str, name: str, data: bytes):
+        pass
+
+    @abstractmethod
+    def put_file(self, job_id: str, name: str, local_path: str):
+        """Uploads / commits a finished local file as an object."""
+
+    @abstractmethod
+    def open(self, job_id: str, name: str) -> BinaryIO:
+        """Seekable binary stream of an object. Raises FileNotFoundError."""
+
+    @abstractmethod
+    def exists(self, job_id: str, name: str) -> bool:
+        pass
+
+    def local_path(self, job_id: str, name: str) -> Optional[str]:
+        """Local file of an object if the backend has one (lets the server use sendfile)."""
+        return None
+
+
+class LocalDirectoryBackend(StorageBackend):
+    """Jobs under {root}/{id[:2]}/{id}/, sharded so no directory grows unbounded."""
+
+    def __init__(self, root: str):
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+
+    def _job_path(self, job_id: str) -> str:
+        if not JOB_ID_PATTERN.match(job_id):
+            raise ValueError(f"Invalid job id: {job_id!r}")
+        return os.path.join(self.root, job_id[:2].lower(), job_id)
+
+    def _object_path(self, job_id: str, name: str) -> str:
+        _check_name(name)
+        return os.path.join(self._job_path(job_id), name)
+
+    def create_job(self, job_id):
+        os.makedirs(self._job_path(job_id), exist_ok=True)
+
+    def job_exists(self, job_id):
+        return os.path.isdir(self._job_path(job_id))
+
+    def list_jobs(self):
+        jobs = []
+        for shard in os.scandir(self.root):
+            if not shard.is_dir():
+                continue
+            for entry in os.scandir(shard.path):
+                if entry.is_dir() and JOB_ID_PATTERN.match(entry.name):
+                    jobs.append(self._job_info(entry.name, entry.path))
+        return jobs
+
+    def _job_info(self, job_id, path):
+        size = 0
+        newest_mtime = 0.0
+        for root, dirs, files in os.walk(path):
+            for file in files:
+                try:
+                    st = os.stat(os.path.join(root, file))
+                except FileNotFoundError:
+                    continue
+                size += st.st_size
+                newest_mtime = max(newest_mtime, st.st_mtime)
+
+        try:
+            with open(os.path.join(path, JOB_META_NAME), "r", encoding="utf-8") as f:
+                meta = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            meta = {}
+
+        created = meta.get("createdAt") or newest_mtime or os.path.getmtime(path)
+        try:
+            last_access = os.path.getmtime(os.path.join(path, ACCESS_MARKER_NAME))
+        except FileNotFoundError:
+            last_access = created
+        return {
+            "jobId": job_id,
+            "size": size,
+            "createdAt": created,
+            "lastAccess": max(last_access, created),
+            "ttlSeconds": meta.get("ttlSeconds"),
+        }
+
+    def delete_job(self, job_id):
+        path = self._job_path(job_id)
+        shutil.rmtree(path, ignore_errors=True)
+        try:
+            os.rmdir(os.path.dirname(path))  # Drop the shard once empty
+        except OSError:
+            pass
+
+    def touch(self, job_id, when=None):
+        path = self._job_path(job_id)
+        if not os.path.isdir(path):
+            return
+        marker = os.path.join(path, ACCESS_MARKER_NAME)
+        if not os.path.exists(marker):
+            open(marker, "a").close()
+        os.utime(marker, None if when is None else (when, when))
+
+    def _atomic_write(self, job_id, name, write):
+        path = self._object_path(job_id, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+        try:
+            write(tmp_path)
+            os.replace(tmp_path, path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def put_bytes(self, job_id, name, data):
+        def write(tmp_path):
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+        self._atomic_write(job_id, name, write)
+
+    def put_file(self, job_id, name, local_path):
+        self._atomic_write(job_id, name, lambda tmp_path: shutil.copyfile(local_path, tmp_path))
+
+    def open(self, job_id, name):
+        return open(self._object_path(job_id, name), "rb")
+
+    def exists(self, job_id, name):
+        return os.path.isfile(self._object_path(job_id, name))
+
+    def local_path(self, job_id, name):
+        return self._object_path(job_id, name)
+
+
+class StorageManager:
+    """Job lifecycle on top of a backend: inputs/outputs, per-job TTL, global byte quota (LRU) and GC.
+
+    All job reads and writes go through here; callers never touch backend paths.
+    """
+
+    def __init__(self, backend: StorageBackend, default_ttl: int, quota_bytes: int = 0):
+        self.backend = backend
+        self.default_ttl = default_ttl    # seconds, 0 = keep forever
+        self.quota_bytes = quota_bytes    # 0 = unlimited
+        # Jobs still being generated are never collected
+        self._active = set()
+        self._lock = threading.Lock()
+        # Serializes manifest read-modify-write
+        self._manifest_lock = threading.Lock()
+
+    # --- Job lifecycle ---
+
+    def create_job(self, job_id: str, ttl_seconds: Optional[int] = None,
+                   created_at: Optional[float] = None, active: bool = True):
+        if active:
+            with self._lock:
+                self._active.add(job_id)
+        self.backend.create_job(job_id)
+        meta = {
+            "createdAt": time.time() if created_at is None else created_at,
+            "ttlSeconds": self.default_ttl if ttl_seconds is None else ttl_seconds
+        }
+        self.backend.put_bytes(job_id, JOB_META_NAME, json.dumps(meta).encode("utf-8"))
+
+    def finish_job(self, job_id: str):
+        with self._lock:
+            self._active.discard(job_id)
+
+    def job_exists(self, job_id: str) -> bool:
+        try:
+            return self.backend.job_exists(job_id)
+        except ValueError:
+            return False
+
+    def touch(self, job_id: str, when: Optional[float] = None):
+        self.backend.touch(job_id, when)
+
+    # --- Objects ---
+
+    def save_input(self, job_id: str, data: Dict[str, Any]):
+        self.backend.put_bytes(job_id, INPUT_NAME, json.dumps(data, indent=2).encode("utf-8"))
+
+    def commit_output(self, job_id: str, name: str, local_path: str) -> Dict[str, Any]:
+        """Stores a finished local file (plus .gz variant for text formats) and lists it in the manifest."""
+        entry, gz_path = prepare_output(local_path)
+        self.backend.put_file(job_id, name, local_path)
+        if gz_path:
+            self.backend.put_file(job_id, name + ".gz", gz_path)
+
+        # Listed last: a manifest entry means the object is complete
+        with self._manifest_lock:
+            manifest = self.load_manifest(job_id)
+            manifest[name] = entry
+            self.backend.put_bytes(job_id, MANIFEST_NAME, json.dumps(manifest, indent=2).encode("utf-8"))
+        return entry
+
+    def load_manifest(self, job_id: str) -> Dict[str, Any]:
+        """{} for unknown / invalid jobs and jobs without outputs yet."""
+        try:
+            with self.backend.open(job_id, MANIFEST_NAME) as f:
+                return json.load(f)
+        except (ValueError, FileNotFoundError):
+            return {}
+
+    def open_output(self, job_id: str, name: str) -> BinaryIO:
+        return self.backend.open(job_id, name)
+
+    def output_exists(self, job_id: str, name: str) -> bool:
+        try:
+            return self.backend.exists(job_id, name)
+        except ValueError:
+            return False
+
+    def local_path(self, job_id: str, name: str) -> Optional[str]:
+        return self.backend.local_path(job_id, name)
+
+    # --- Garbage collection ---
+
+    def collect_garbage(self, now: Optional[float] = None) -> Dict[str, int]:
+        """Deletes expired jobs, then least recently used ones until under quota."""
+        now = time.time() if now is None else now
+        with self._lock:
+            active = set(self._active)
+
+        expired = 0
+        evicted = 0
+        freed = 0
+        total = 0
+        job_count = 0
+
+        candidates = []
+        for job in self.backend.list_jobs():
+            if job["jobId"] in active:
+                # Active jobs count towards the quota but are never deleted
+                total += job["size"]
+                job_count += 1
+                continue
+            ttl = job["ttlSeconds"]
+            if ttl and job["createdAt"] + ttl <= now:
+                self.backend.delete_job(job["jobId"])
+                expired += 1
+                freed += job["size"]
+                continue
+            candidates.append(job)
+            total += job["size"]
+            job_count += 1
+
+        if self.quota_bytes and total > self.quota_bytes:
+            for job in sorted(candidates, key=lambda j: j["lastAccess"]):
+                if total <= self.quota_bytes:
+                    break
+                self.backend.delete_job(job["jobId"])
+                evicted += 1
+                freed += job["size"]
+                total -= job["size"]
+                job_count -= 1
+
+        metrics.inc("gc_runs_total")
+        metrics.inc("gc_expired_jobs_total", expired)
+        metrics.inc("gc_evicted_jobs_total", evicted)
+        metrics.inc("gc_freed_bytes_total", freed)
+        metrics.set_gauge("storage_bytes", total)
+        metrics.set_gauge("storage_jobs", job_count)
+
+        return {"expired": expired, "evicted": evicted, "freedBytes": freed}
+
+    def import_legacy(self, uploads_dir: str, outputs_dir: str) -> int:
+        """Moves jobs from the old layout (uploads/{id}.json + outputs/{id}/) into storage.
+
+        Imported jobs keep their original age (file mtime), so TTL and quota apply
+        to them like to any other job. The legacy files are removed afterwards.
+        """
+        job_ids = set()
+        if os.path.isdir(uploads_dir):
+            job_ids.update(os.path.splitext(f)[0] for f in os.listdir(uploads_dir) if f.endswith(".json"))
+        if os.path.isdir(outputs_dir):
+            job_ids.update(d for d in os.listdir(outputs_dir) if os.path.isdir(os.path.join(outputs_dir, d)))
+
+        imported = 0
+        for job_id in sorted(job_ids):
+            if not JOB_ID_PATTERN.match(job_id):
+                print(f"[WARN] Skipping legacy job with unexpected id: {job_id!r}")
+                continue
+            upload_path = os.path.join(uploads_dir, f"{job_id}.json")
+            output_dir = os.path.join(outputs_dir, job_id)
+            has_upload = os.path.isfile(upload_path)
+            has_outputs = os.path.isdir(output_dir)
+
+            output_files = []
+            if has_outputs:
+                for name in sorted(os.listdir(output_dir)):
+                    path = os.path.join(output_dir, name)
+                    # Manifest / .gz variants are rebuilt by commit_output
+                    if os.path.isfile(path) and name != MANIFEST_NAME and not name.endswith(".gz"):
+                        output_files.append((name, path))
+
+            mtimes = [os.path.getmtime(p) for _, p in output_files]
+            if has_upload:
+                mtimes.append(os.path.getmtime(upload_path))
+            created_at = min(mtimes) if mtimes else None
+
+            self.create_job(job_id, created_at=created_at, active=False)
+            if has_upload:
+                self.backend.put_file(job_id, INPUT_NAME, upload_path)
+            for name, path in output_files:
+                try:
+                    self.commit_output(job_id, name, path)
+                except ValueError:
+                    print(f"[WARN] Skipping legacy output {name!r} of {job_id}")
+
+            if has_upload:
+                os.remove(upload_path)
+            if has_outputs:
+                shutil.rmtree(output_dir, ignore_errors=True)
+            imported += 1
+
+        for legacy_dir in (uploads_dir, outputs_dir):
+            try:
+                os.rmdir(legacy_dir)  # Only once empty
+            except OSError:
+                pass
+
+        metrics.inc("storage_legacy_imported_total", imported)
+        return imported
@@ -1,21 +1,35 @@
-from fastapi import FastAPI, UploadFile, HTTPException, BackgroundTasks
-from fastapi.responses import FileResponse, JSONResponse
-from pydantic import BaseModel
-from typing import List, Optional, Dict, Any
+from fastapi import FastAPI, UploadFile, HTTPException, BackgroundTasks, Request
+from fastapi.responses import FileResponse, JSONResponse, PlainTextResponse, Response, StreamingResponse
+from starlette.concurrency import run_in_threadpool
+from pydantic import BaseModel, Field
+from typing import List, Optional, Dict, Any, Tuple
 import shutil
 import os
 import uuid
 import json
+import asyncio
+import importlib
+import tempfile
+import threading
+import mimetypes
 
 from fastapi.staticfiles import StaticFiles
 
 app = FastAPI(title="Azure Topology Auto-Generator API")
 
-# Storage config (Local for now)
-UPLOAD_DIR = "storage/uploads"
-OUTPUT_DIR = "storage/outputs"
-os.makedirs(UPLOAD_DIR, exist_ok=True)
-os.makedirs(OUTPUT_DIR, exist_ok=True)
+from core.storage import LocalDirectoryBackend, StorageManager
+
+# Storage config (Local directory for now; any StorageBackend can be plugged in)
+# One directory per job (input + outputs): storage/jobs/{id[:2]}/{id}/
+STORAGE_DIR = os.environ.get("TOPOLOGY_STORAGE_DIR", "storage/jobs")
+# Pre-job-directory layout, imported into STORAGE_DIR once on startup
+LEGACY_UPLOAD_DIR = "storage/uploads"
+LEGACY_OUTPUT_DIR = "storage/outputs"
+JOB_TTL_SECONDS = int(os.environ.get("TOPOLOGY_JOB_TTL", 7 * 24 * 3600))      # 0 = keep forever
+STORAGE_QUOTA_BYTES = int(os.environ.get("TOPOLOGY_STORAGE_QUOTA", 5 * 1024**3))  # 0 = unlimited
+GC_INTERVAL_SECONDS = int(os.environ.get("TOPOLOGY_GC_INTERVAL", 600))
+
+storage = StorageManager(LocalDirectoryBackend(STORAGE_DIR), JOB_TTL_SECONDS, STORAGE_QUOTA_BYTES)
 os.makedirs("server/static", exist_ok=True)
 
 app.mount("/static", StaticFiles(directory="server/static"), name="static")
@@ -24,6 +38,13 @@ class TopologyRequest(BaseModel):
     resourceGroup: str
     resources: List[Dict[str, Any]]
     relationships: List[Dict[str, Any]]
+    # Level-of-detail: None = auto (aggregate only very large topologies)
+    aggregate: Optional[bool] = None
+    aggregateThreshold: Optional[int] = None
+    # Opt-in cProfile dump (profile.prof / profile.txt) next to the outputs
+    profile: Optional[bool] = False
+    # How long the job is kept (None = server default, 0 = until evicted by the quota)
+    ttlSeconds: Optional[int] = Field(default=None, ge=0)
 
 # Import Engine (Lazy import to allow main to run even if engine text is not fully ready)
 # from core.engine import generate_diagrams
@@ -36,14 +57,19 @@ def read_root():
 async def upload_topology(request: TopologyRequest, background_tasks: BackgroundTasks):
     request_id = str(uuid.uuid4())
     
-    # 1. Save JSON
-    json_path = os.path.join(UPLOAD_DIR, f"{request_id}.json")
-    with open(json_path, "w", encoding='utf-8') as f:
-        json.dump(request.dict(), f, indent=2)
-    
-    # 2. Trigger Generation (In background)
-    # Background task to generate PNG/PPTX
-    background_tasks.add_task(process_topology, request_id, request.dict())
+    try:
+        # 1. Save JSON
+        await run_in_threadpool(storage.create_job, request_id, request.ttlSeconds)
+        await run_in_threadpool(storage.save_input, request_id, request.dict())
+        
+        # 2. Trigger Generation (In background)
+        # Background task to generate preview/PNG/PPTX; progress is pushed on the events stream
+        events.open_channel(request_id)
+        background_tasks.add_task(run_job, request_id, request.dict())
+    except Exception:
+        # run_job will not run, so release the job here (otherwise the GC never collects it)
+        storage.finish_job(request_id)
+        raise
     
     # 3. Return URLs (Optimistic)
     base_url = "http://localhost:8000" # TODO: Configure dynamically
@@ -51,54 +77,382 @@ async def upload_topology(request: TopologyRequest, background_tasks: Background
         "requestId": request_id,
         "status": "Processing",
         "links": {
+            "preview": f"{base_url}/download/{request_id}/preview.png",
             "png": f"{base_url}/download/{request_id}/topology.png",
-            "pptx": f"{base_url}/download/{request_id}/topology.pptx"
+            "pptx": f"{base_url}/download/{request_id}/topology.pptx",
+            "events": f"{base_url}/api/topology/{request_id}/events"
         }
     }
 
+# Outputs announced on the events stream, in pipeline order
+EVENT_OUTPUTS = [("preview", "preview.png"), ("png", "topology.png"), ("pptx", "topology.pptx")]
+SSE_KEEPALIVE_SECONDS = 15
+
+@app.get("/api/topology/{request_id}/events")
+async def topology_events(request_id: str):
+    """Server-Sent Events: preview / png / pptx as each output becomes available, then done or error."""
+    if not events.has_channel(request_id) and not await run_in_threadpool(storage.job_exists, request_id):
+        raise HTTPException(status_code=404, detail="Unknown request")
+    return StreamingResponse(
+        _event_stream(request_id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+async def _event_stream(request_id: str):
+    if events.has_channel(request_id):
+        async for event in events.subscribe(request_id, keepalive=SSE_KEEPALIVE_SECONDS):
+            # Comment lines keep proxies from closing an idle connection
+            yield ": keep-alive\n\n" if event is None else _format_event(event)
+        return
+    
+    # Job not running in this process (finished earlier, or server restarted): replay from the manifest
+    if not await run_in_threadpool(storage.job_exists, request_id):
+        # Expired / evicted since the request was accepted
+        yield _format_event({"type": "error", "detail": "Job not found"})
+        return
+    manifest = await run_in_threadpool(storage.load_manifest, request_id)
+    for fmt, filename in EVENT_OUTPUTS:
+        if filename in manifest:
+            yield _format_event({"type": fmt, "url": f"/download/{request_id}/{filename}"})
+    if "metrics.json" in manifest:
+        # Written last, so the job has ended
+        if "topology.pptx" in manifest:
+            yield _format_event({"type": "done"})
+        else:
+            yield _format_event({"type": "error", "detail": "Generation failed"})
+    else:
+        yield _format_event({"type": "error", "detail": "Job is not running on this server"})
+
+def _format_event(event: Dict[str, Any]) -> str:
+    return f"event: {event['type']}\ndata: {json.dumps(event)}\n\n"
+
+# Outputs never change once listed in the job manifest, so clients may cache them for good
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
 @app.get("/download/{request_id}/{file_type}")
-def download_file(request_id: str, file_type: str):
+async def download_file(request_id: str, file_type: str, request: Request):
     # file_type: topology.png or topology.pptx
-    filename = file_type # simplified
-    file_path = os.path.join(OUTPUT_DIR, request_id, filename)
+    filename = os.path.basename(file_type)
     
-    if not os.path.exists(file_path):
+    # Storage lookups happen in a worker thread, not on the event loop
+    entry, has_gzip = await run_in_threadpool(_resolve_download, request_id, filename)
+    if not entry:
         # Check if processing failed or still running
         # For simple UX, return 404 or a placeholder 'processing' image
         raise HTTPException(status_code=404, detail="File not found or still processing")
-        
-    return FileResponse(file_path)
+    await run_in_threadpool(storage.touch, request_id)
+    
+    media_type = mimetypes.guess_type(filename)[0] or "application/octet-stream"
+    etag = f'"{entry["sha256"]}"'
+    headers = {"Cache-Control": IMMUTABLE_CACHE_CONTROL, "Accept-Ranges": "bytes"}
+    if entry.get("gzip"):
+        headers["Vary"] = "Accept-Encoding"
+    
+    # Precompressed variant (not combined with ranges, which address the identity bytes)
+    range_header = request.headers.get("range")
+    use_gzip = has_gzip and not range_header and _accepts_gzip(request.headers.get("accept-encoding"))
+    if use_gzip:
+        etag = f'"{entry["sha256"]}-gzip"'
+    headers["ETag"] = etag
+    
+    if _etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    
+    if use_gzip:
+        headers["Content-Encoding"] = "gzip"
+        return _object_response(request_id, filename + ".gz", entry["gzipSize"], media_type, headers)
+    
+    # If-Range: only honour the range when the client's copy is still current
+    if_range = request.headers.get("if-range")
+    if range_header and (not if_range or if_range.strip() == etag):
+        size = entry["size"]
+        byte_range = _parse_range(range_header, size)
+        if byte_range:
+            start, end = byte_range
+            headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+            headers["Content-Length"] = str(end - start + 1)
+            return StreamingResponse(
+                _iter_object_range(request_id, filename, start, end),
+                status_code=206, media_type=media_type, headers=headers
+            )
+    
+    return _object_response(request_id, filename, entry["size"], media_type, headers)
+
+def _resolve_download(request_id: str, filename: str):
+    """Manifest entry of a finished output (None if missing / still processing), and whether its .gz exists."""
+    # Only objects listed in the manifest are complete
+    entry = storage.load_manifest(request_id).get(filename)
+    if not entry or not storage.output_exists(request_id, filename):
+        return None, False
+    has_gzip = bool(entry.get("gzip")) and "gzipSize" in entry and storage.output_exists(request_id, filename + ".gz")
+    return entry, has_gzip
+
+def _object_response(request_id: str, name: str, size: int, media_type: str, headers: Dict[str, str]):
+    # Local backends serve the file directly (sendfile); others are streamed from the backend
+    local_path = storage.local_path(request_id, name)
+    if local_path:
+        return FileResponse(local_path, media_type=media_type, headers=headers)
+    headers["Content-Length"] = str(size)
+    return StreamingResponse(_iter_object_range(request_id, name, 0, size - 1),
+                             media_type=media_type, headers=headers)
+
+def _accepts_gzip(accept_encoding: Optional[str]) -> bool:
+    """True when Accept-Encoding allows gzip (q > 0, either explicitly or via *)."""
+    if not accept_encoding:
+        return False
+    qualities = {}
+    for part in accept_encoding.split(","):
+        coding, *params = [p.strip() for p in part.split(";")]
+        if not coding:
+            continue
+        q = 1.0
+        for param in params:
+            name, _, value = param.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        qualities[coding.lower()] = q
+    if "gzip" in qualities:
+        return qualities["gzip"] > 0
+    return qualities.get("*", 0) > 0
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    # Weak comparison, as required for If-None-Match
+    tags = [t.strip() for t in if_none_match.split(",")]
+    return any(t[2:] == etag if t.startswith("W/") else t == etag for t in tags)
+
+def _parse_range(range_header: str, size: int) -> Optional[Tuple[int, int]]:
+    """Parses a single `bytes=` range into (start, end), both inclusive.
+
+    Returns None for headers we do not support (multiple ranges, other units), in
+    which case the full file is sent. Unsatisfiable ranges raise 416.
+    """
+    unit, _, spec = range_header.partition("=")
+    if unit.strip().lower() != "bytes" or "," in spec:
+        return None
+    first, _, last = spec.strip().partition("-")
+    try:
+        if first:
+            start = int(first)
+            if last and int(last) < start:
+                return None  # Syntactically invalid, ignored per RFC 7233
+            end = min(int(last), size - 1) if last else size - 1
+        else:
+            # Suffix range: last N bytes
+            start = max(size - int(last), 0)
+            end = size - 1
+    except ValueError:
+        return None
+    if start >= size:
+        raise HTTPException(status_code=416, detail="Range not satisfiable",
+                            headers={"Content-Range": f"bytes */{size}"})
+    return start, end
+
+def _iter_object_range(request_id: str, name: str, start: int, end: int):
+    with storage.open_output(request_id, name) as f:
+        f.seek(start)
+        remaining = end - start + 1
+        while remaining > 0:
+            chunk = f.read(min(CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def get_metrics():
+    # Prometheus text exposition format
+    return PlainTextResponse(metrics.render_prometheus(), media_type="text/plain; version=0.0.4")
+
+from core import metrics, events
+from core.outputs import CHUNK_SIZE
+from core.layout import LayoutEngine, flatten_layout, AGGREGATE_THRESHOLD, AUTO_AGGREGATE_RESOURCES
+
+# Renderers pull in PIL / python-pptx / svglib / reportlab, so each is imported on first use
+RENDERERS = {
+    "preview": ("core.renderer_preview", "generate_preview_file"),
+    "png": ("core.renderer_img", "generate_image_file"),
+    "pptx": ("core.renderer_pptx", "generate_pptx_file"),
+}
+
+# Set TOPOLOGY_WARMUP=0 to skip the background warmup (e.g. for short-lived workers)
+WARMUP_ENABLED = os.environ.get("TOPOLOGY_WARMUP", "1") != "0"
+
+def get_renderer(fmt: str):
+    module_name, func_name = RENDERERS[fmt]
+    return getattr(importlib.import_module(module_name), func_name)
+
+@app.on_event("startup")
+def start_warmup():
+    # Off the request path: the server answers immediately while the renderers load
+    if WARMUP_ENABLED:
+        threading.Thread(target=warmup, name="warmup", daemon=True).start()
 
-from core.layout import LayoutEngine
-from core.renderer_pptx import generate_pptx_file
-from core.renderer_img import generate_image_file
+@app.on_event("startup")
+async def start_storage_gc():
+    asyncio.create_task(storage_gc_loop())
 
-async def process_topology(request_id: str, data: Dict[str, Any]):
+async def storage_gc_loop():
+    """Expires / evicts old jobs periodically, in a worker thread off the request path."""
+    try:
+        imported = await run_in_threadpool(storage.import_legacy, LEGACY_UPLOAD_DIR, LEGACY_OUTPUT_DIR)
+        if imported:
+            print(f"[INFO] Imported {imported} jobs from the legacy storage layout")
+    except Exception as e:
+        print(f"[WARN] Legacy storage import failed: {e}")
+    
+    while True:
+        try:
+            result = await run_in_threadpool(storage.collect_garbage)
+            if result["expired"] or result["evicted"]:
+                print(f"[INFO] Storage GC: {result}")
+        except Exception as e:
+            print(f"[WARN] Storage GC failed: {e}")
+        await asyncio.sleep(GC_INTERVAL_SECONDS)
+
+def warmup():
+    """Imports the renderers, walks the icon directory and rasterizes the common icons."""
+    try:
+        with metrics.stage("warmup"):
+            for fmt in RENDERERS:
+                get_renderer(fmt)
+            from core.icon_manager import warmup as warmup_icons
+            warmup_icons()
+        print("[INFO] Warmup finished.")
+    except Exception as e:
+        print(f"[WARN] Warmup failed: {e}")
+
+async def run_job(request_id: str, data: Dict[str, Any]):
+    # Renderers write local files; finished ones are committed to storage
+    work_dir = tempfile.mkdtemp(prefix=f"topology-{request_id}-")
+    try:
+        await process_topology(request_id, data, work_dir)
+    except Exception as e:
+        # process_topology reports pipeline errors itself; this only catches its own failures
+        print(f"Error finishing {request_id}: {e}")
+        events.publish(request_id, {"type": "error", "detail": str(e)})
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+        # From now on the job may be expired / evicted by the GC
+        storage.finish_job(request_id)
+
+async def process_topology(request_id: str, data: Dict[str, Any], work_dir: str):
     print(f"Processing topology for {request_id}...")
     
-    # Create output dir for this request
-    req_output_dir = os.path.join(OUTPUT_DIR, request_id)
-    os.makedirs(req_output_dir, exist_ok=True)
+    profiler = None
+    if data.get('profile'):
+        import cProfile
+        profiler = cProfile.Profile()
     
-    try:
-        # 1. Run Layout Engine
-        engine = LayoutEngine(data)
-        layout_nodes = engine.calculate_layout()
-        
-        # 2. Render PNG
-        png_path = os.path.join(req_output_dir, "topology.png")
-        generate_image_file(layout_nodes, data.get('relationships', []), png_path)
-        
-        # 3. Render PPTX
-        pptx_path = os.path.join(req_output_dir, "topology.pptx")
-        generate_pptx_file(layout_nodes, data.get('relationships', []), pptx_path)
+    # Heavy stages run in a worker thread, so the server (and the SSE stream) stays responsive.
+    # asyncio.to_thread copies the context, so per-job metrics still apply.
+    async def run_stage(stage_name, func, *args):
+        return await asyncio.to_thread(_run_profiled, profiler, stage_name, func, *args)
+    
+    async def commit(filename):
+        await asyncio.to_thread(storage.commit_output, request_id, filename, os.path.join(work_dir, filename))
+    
+    async def render(stage_name, fmt, filename):
+        # First use imports PIL / python-pptx / svglib: keep that off the event loop (and out of the stage timing)
+        renderer = await asyncio.to_thread(get_renderer, fmt)
+        await run_stage(stage_name, renderer, layout_nodes, relationships, os.path.join(work_dir, filename))
+        await commit(filename)
+        events.publish(request_id, {"type": fmt, "url": f"/download/{request_id}/{filename}"})
+    
+    metrics.inc("jobs_total")
+    with metrics.job_metrics(request_id) as job:
+        try:
+            # 1. Run Layout Engine
+            aggregate = data.get('aggregate')
+            if aggregate is None:
+                aggregate = len(data.get('resources', [])) > AUTO_AGGREGATE_RESOURCES
             
-        print(f"Finished processing {request_id}")
-        
-    except Exception as e:
-        print(f"Error processing {request_id}: {e}")
-        import traceback
-        traceback.print_exc()
+            def layout():
+                engine = LayoutEngine(
+                    data,
+                    aggregate=aggregate,
+                    aggregate_threshold=data.get('aggregateThreshold') or AGGREGATE_THRESHOLD
+                )
+                return engine.calculate_layout(), engine.get_relationships()
+            
+            layout_nodes, relationships = await run_stage("layout", layout)
+            metrics.set_gauge("layout_nodes", len(flatten_layout(layout_nodes)))
+            metrics.set_gauge("layout_edges", len(relationships))
+            
+            # 2. Render quick preview (no icons), shown until the full PNG is ready
+            try:
+                await render("render_preview", "preview", "preview.png")
+            except Exception as e:
+                print(f"[WARN] Preview failed for {request_id}: {e}")
+            
+            # 3. Render PNG
+            await render("render_png", "png", "topology.png")
+            
+            # 4. Render PPTX
+            await render("render_pptx", "pptx", "topology.pptx")
+                
+            print(f"Finished processing {request_id}")
+            
+        except Exception as e:
+            metrics.inc("jobs_failed_total")
+            job["error"] = str(e)
+            print(f"Error processing {request_id}: {e}")
+            import traceback
+            traceback.print_exc()
+        finally:
+            if profiler:
+                await asyncio.to_thread(_dump_profile, profiler, work_dir)
+                await commit("profile.prof")
+                await commit("profile.txt")
+    
+    # Per-job metrics next to the outputs (stage timings, icon cache hits/misses, node/edge counts)
+    await asyncio.to_thread(_write_json, os.path.join(work_dir, "metrics.json"), job)
+    await commit("metrics.json")
+    
+    if "error" in job:
+        events.publish(request_id, {"type": "error", "detail": job["error"]})
+    else:
+        events.publish(request_id, {"type": "done"})
+
+
+# Only one profiler may be active at a time (Python 3.12+ raises ValueError otherwise),
+# so profiled stages of concurrent jobs run one after another
+_profile_lock = threading.Lock()
+
+def _run_profiled(profiler, stage_name, func, *args):
+    # Timed here in the worker (after the profiler lock), so waiting for a thread-pool
+    # slot or for another job's profiled stage is not blamed on this stage
+    if profiler is None:
+        with metrics.stage(stage_name):
+            return func(*args)
+    # cProfile only sees the thread it is enabled in, so enable it per stage
+    with _profile_lock:
+        profiler.enable()
+        try:
+            with metrics.stage(stage_name):
+                return func(*args)
+        finally:
+            profiler.disable()
+
+
+def _write_json(path, data):
+    with open(path, "w", encoding='utf-8') as f:
+        json.dump(data, f, indent=2)
+
+
+def _dump_profile(profiler, output_dir):
+    import pstats
+    profiler.dump_stats(os.path.join(output_dir, "profile.prof"))
+    with open(os.path.join(output_dir, "profile.txt"), "w", encoding='utf-8') as f:
+        stats = pstats.Stats(profiler, stream=f)
+        stats.sort_stats("cumulative").print_stats(50)
 
 
 if __name__ == "__main__":
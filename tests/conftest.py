@@ -0,0 +1,44 @@
+import os
+import sys
+import importlib.util
+
+import pytest
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Server modules are imported as `core.*`, like server/main.py does
+sys.path.insert(0, os.path.join(REPO_ROOT, "server"))
+
+
+def load_script(filename, module_name):
+    """Imports a hyphenated script from scripts/."""
+    path = os.path.join(REPO_ROOT, "scripts", filename)
+    spec = importlib.util.spec_from_file_location(module_name, path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+@pytest.fixture(scope="session")
+def parser_module():
+    return load_script("parse-relations.py", "parse_relations")
+
+
+@pytest.fixture(scope="session")
+def synthetic():
+    return load_script("generate-synthetic-topology.py", "generate_synthetic_topology")
+
+
+@pytest.fixture(scope="session")
+def server_main(tmp_path_factory):
+    """server/main.py, imported with its storage under a temporary directory."""
+    pytest.importorskip("fastapi")
+    os.environ["TOPOLOGY_STORAGE_DIR"] = str(tmp_path_factory.mktemp("jobs"))
+    # main.py mounts server/static relative to the working directory
+    cwd = os.getcwd()
+    os.chdir(REPO_ROOT)
+    try:
+        import main
+    finally:
+        os.chdir(cwd)
+    return main
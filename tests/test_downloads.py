@@ -0,0 +1,170 @@
+import asyncio
+import uuid
+
+import pytest
+
+# Starlette 0.35's TestClient does not work with httpx >= 0.28, so requests go
+# through httpx's ASGI transport directly
+httpx = pytest.importorskip("httpx")
+
+BODY = b'{"stages": {"layout": 0.5, "render_png": 1.25}}' * 20
+
+
+@pytest.fixture
+def output(server_main, tmp_path):
+    """A finished job with one compressible output; returns (download URL, manifest entry)."""
+    request_id = str(uuid.uuid4())
+    server_main.storage.create_job(request_id, active=False)
+    path = tmp_path / "metrics.json"
+    path.write_bytes(BODY)
+    entry = server_main.storage.commit_output(request_id, "metrics.json", str(path))
+    return f"/download/{request_id}/metrics.json", entry
+
+
+def _get(server_main, url, **headers):
+    async def get():
+        transport = httpx.ASGITransport(app=server_main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await client.get(url, headers=headers)
+    return asyncio.run(get())
+
+
+# --- Helpers ---
+
+@pytest.mark.parametrize("header, expected", [
+    (None, False),
+    ("gzip", True),
+    ("deflate, gzip;q=0.5", True),
+    ("gzip;q=0", False),
+    ("GZIP; Q=0.0", False),
+    ("br", False),
+    ("*", True),
+    ("*, gzip;q=0", False),
+    ("identity, *;q=0", False),
+    ("gzip;q=bogus", False),
+])
+def test_accepts_gzip(server_main, header, expected):
+    assert server_main._accepts_gzip(header) is expected
+
+
+@pytest.mark.parametrize("header, expected", [
+    (None, False),
+    ('"abc"', True),
+    ('W/"abc"', True),
+    ('"other", W/"abc"', True),
+    ("*", True),
+    ('"abc-gzip"', False),
+])
+def test_etag_matches(server_main, header, expected):
+    assert server_main._etag_matches(header, '"abc"') is expected
+
+
+@pytest.mark.parametrize("header, expected", [
+    ("bytes=0-99", (0, 99)),
+    ("bytes=10-", (10, 999)),
+    ("bytes=-100", (900, 999)),
+    ("bytes=-5000", (0, 999)),
+    ("bytes=990-5000", (990, 999)),
+    ("bytes=0-1,5-6", None),     # Multiple ranges: full file
+    ("items=0-1", None),
+    ("bytes=5-1", None),
+    ("bytes=a-b", None),
+])
+def test_parse_range(server_main, header, expected):
+    assert server_main._parse_range(header, 1000) == expected
+
+
+def test_parse_range_unsatisfiable(server_main):
+    with pytest.raises(server_main.HTTPException) as exc:
+        server_main._parse_range("bytes=1000-", 1000)
+    assert exc.value.status_code == 416
+    assert exc.value.headers["Content-Range"] == "bytes */1000"
+
+
+# --- Responses ---
+
+def test_full_download_is_cacheable(server_main, output):
+    url, entry = output
+    resp = _get(server_main, url, **{"Accept-Encoding": "identity"})
+
+    assert resp.status_code == 200
+    assert resp.content == BODY
+    assert resp.headers["etag"] == f'"{entry["sha256"]}"'
+    assert "immutable" in resp.headers["cache-control"]
+    assert "content-encoding" not in resp.headers
+
+
+def test_if_none_match_returns_304(server_main, output):
+    url, entry = output
+    resp = _get(server_main, url, **{"Accept-Encoding": "identity", "If-None-Match": f'W/"{entry["sha256"]}"'})
+
+    assert resp.status_code == 304
+    assert resp.content == b""
+    assert resp.headers["etag"] == f'"{entry["sha256"]}"'
+
+
+def test_range_returns_206(server_main, output):
+    url, entry = output
+    resp = _get(server_main, url, **{"Accept-Encoding": "identity", "Range": "bytes=10-19"})
+
+    assert resp.status_code == 206
+    assert resp.content == BODY[10:20]
+    assert resp.headers["content-range"] == f"bytes 10-19/{len(BODY)}"
+    assert resp.headers["content-length"] == "10"
+
+
+def test_unsatisfiable_range_returns_416(server_main, output):
+    url, entry = output
+    resp = _get(server_main, url, Range=f"bytes={len(BODY)}-")
+
+    assert resp.status_code == 416
+    assert resp.headers["content-range"] == f"bytes */{len(BODY)}"
+
+
+def test_stale_if_range_sends_full_file(server_main, output):
+    url, entry = output
+    resp = _get(server_main, url, **{"Accept-Encoding": "identity", "Range": "bytes=10-19", "If-Range": '"stale"'})
+
+    assert resp.status_code == 200
+    assert resp.content == BODY
+
+
+def test_gzip_variant_has_its_own_etag(server_main, output):
+    url, entry = output
+    resp = _get(server_main, url, **{"Accept-Encoding": "gzip"})
+
+    assert resp.status_code == 200
+    assert resp.headers["content-encoding"] == "gzip"
+    assert resp.headers["etag"] == f'"{entry["sha256"]}-gzip"'
+    assert resp.headers["vary"] == "Accept-Encoding"
+    assert resp.content == BODY  # Decoded by httpx
+    assert int(resp.headers["content-length"]) == entry["gzipSize"] < len(BODY)
+
+    # The identity ETag does not validate the gzip variant, and vice versa
+    assert _get(server_main, url, **{"Accept-Encoding": "gzip", "If-None-Match": resp.headers["etag"]}).status_code == 304
+    assert _get(server_main, url, **{"Accept-Encoding": "gzip", "If-None-Match": f'"{entry["sha256"]}"'}).status_code == 200
+
+
+def test_gzip_refused_with_zero_quality(server_main, output):
+    url, entry = output
+    resp = _get(server_main, url, **{"Accept-Encoding": "gzip;q=0"})
+
+    assert "content-encoding" not in resp.headers
+    assert resp.content == BODY
+
+
+def test_range_disables_gzip(server_main, output):
+    url, entry = output
+    resp = _get(server_main, url, **{"Accept-Encoding": "gzip", "Range": "bytes=0-9"})
+
+    assert resp.status_code == 206
+    assert "content-encoding" not in resp.headers
+    assert resp.content == BODY[:10]
+    assert resp.headers["etag"] == f'"{entry["sha256"]}"'
+
+
+def test_unknown_output_returns_404(server_main, output):
+    url, entry = output
+    assert _get(server_main, url.replace("metrics.json", "topology.png")).status_code == 404
+    assert _get(server_main, f"/download/{uuid.uuid4()}/metrics.json").status_code == 404
+
@@ -0,0 +1,60 @@
+import asyncio
+
+from core import events
+
+
+def _collect(job_id, keepalive=None, limit=None):
+    async def collect():
+        received = []
+        async for event in events.subscribe(job_id, keepalive=keepalive):
+            received.append(event)
+            if limit and len(received) >= limit:
+                break
+        return received
+    return collect()
+
+
+def test_subscribe_replays_backlog_and_stops_at_terminal_event():
+    async def run():
+        events.open_channel("job-replay")
+        events.publish("job-replay", {"type": "preview"})
+        events.publish("job-replay", {"type": "error", "detail": "boom"})
+        events.publish("job-replay", {"type": "png"})  # After the terminal event: not delivered
+        return await _collect("job-replay")
+
+    assert [e["type"] for e in asyncio.run(run())] == ["preview", "error"]
+
+
+def test_subscribe_yields_none_on_keepalive_then_live_events():
+    async def run():
+        events.open_channel("job-keepalive")
+        subscriber = asyncio.ensure_future(_collect("job-keepalive", keepalive=0.05))
+        await asyncio.sleep(0.12)
+        events.publish("job-keepalive", {"type": "png"})
+        events.publish("job-keepalive", {"type": "done"})
+        return await subscriber
+
+    received = asyncio.run(run())
+    assert received[0] is None
+    assert [e["type"] for e in received if e is not None] == ["png", "done"]
+
+
+def test_late_subscriber_gets_history_until_retention_expires(monkeypatch):
+    monkeypatch.setattr(events, "RETENTION_SECONDS", 0.05)
+
+    async def run():
+        events.open_channel("job-late")
+        events.publish("job-late", {"type": "pptx"})
+        events.publish("job-late", {"type": "done"})
+        late = await _collect("job-late")
+        await asyncio.sleep(0.1)
+        return late, events.has_channel("job-late"), await _collect("job-late")
+
+    late, still_open, expired = asyncio.run(run())
+    assert [e["type"] for e in late] == ["pptx", "done"]
+    assert not still_open
+    assert expired == []
+
+
+def test_unknown_channel_yields_nothing():
+    assert asyncio.run(_collect("job-unknown")) == []
@@ -0,0 +1,126 @@
+import json
+import os
+
+import pytest
+
+from core.layout import LayoutEngine, flatten_layout
+
+MOCK_TOPOLOGY = os.path.join(os.path.dirname(__file__), "mock_topology.json")
+
+
+def _parsed_topology(parser_module, synthetic, **counts):
+    raw = synthetic.generate_raw_resources(resource_group="rg", **counts)
+    return parser_module.parse_topology(raw, "rg")
+
+
+def _find(nodes, name):
+    for node in nodes:
+        if node['resource']['name'] == name:
+            return node
+        found = _find(node['children'], name)
+        if found:
+            return found
+    return None
+
+
+def test_parser_output_nests_vms_under_nics(parser_module, synthetic):
+    topology = _parsed_topology(parser_module, synthetic, vnets=1, subnets=1, vms=2, lbs=0, nsgs=0, public_ips=0)
+    nodes = LayoutEngine(topology).calculate_layout()
+
+    subnet = nodes[0]['children'][0]
+    assert [n['type'] for n in subnet['children']] == ["Microsoft.Network/networkInterfaces"] * 2
+    assert all(n['children'][0]['type'] == "Microsoft.Compute/virtualMachines" for n in subnet['children'])
+    # No VM left over as an orphan
+    assert len(nodes) == 1
+
+
+def test_subnet_nic_vm_pairs_collapse_into_one_summary(parser_module, synthetic):
+    topology = _parsed_topology(parser_module, synthetic, vnets=1, subnets=2, vms=12, lbs=0, nsgs=0, public_ips=0)
+    engine = LayoutEngine(topology, aggregate=True, aggregate_threshold=10)
+    nodes = engine.calculate_layout()
+
+    assert len(nodes) == 1
+    for subnet in nodes[0]['children']:
+        assert len(subnet['children']) == 1
+        summary = subnet['children'][0]
+        assert summary['resource']['name'] == "12 VMs"
+        assert summary['aggregate']['count'] == 12
+        # 12 NICs + 12 VMs map onto the summary
+        assert len(summary['aggregate']['members']) == 24
+
+    # Subnet -> NIC edges collapse into one edge per subnet, NIC -> VM edges disappear
+    edges = engine.get_relationships()
+    assert sum(1 for e in edges if e['type'] == "Attached") == 2
+    assert not any(e['type'] == "AttachedTo" for e in edges)
+
+
+def test_groups_below_threshold_are_kept(parser_module, synthetic):
+    topology = _parsed_topology(parser_module, synthetic, vnets=1, subnets=1, vms=3, lbs=0, nsgs=0, public_ips=0)
+    engine = LayoutEngine(topology, aggregate=True, aggregate_threshold=10)
+    nodes = engine.calculate_layout()
+
+    assert len(nodes[0]['children'][0]['children']) == 3
+    assert engine.get_relationships() is engine.relationships
+
+
+def test_orphans_of_one_type_collapse(parser_module, synthetic):
+    topology = _parsed_topology(parser_module, synthetic, vnets=1, subnets=1, vms=1, lbs=0, nsgs=0, public_ips=15)
+    nodes = LayoutEngine(topology, aggregate=True, aggregate_threshold=10).calculate_layout()
+
+    assert _find(nodes, "15 Public IPs") is not None
+    assert _find(nodes, "pip-0000") is None
+
+
+def test_mock_topology_layout_unchanged_without_aggregation():
+    with open(MOCK_TOPOLOGY, encoding="utf-8") as f:
+        topology = json.load(f)
+    nodes = LayoutEngine(topology).calculate_layout()
+
+    assert [n['resource']['name'] for n in nodes] == ["demo-vnet", "app-lb"]
+    assert _find(nodes, "web-vm01") is not None
+
+
+def test_renderers_draw_nested_vms(parser_module, synthetic):
+    topology = _parsed_topology(parser_module, synthetic, vnets=1, subnets=2, vms=12, lbs=0, nsgs=0, public_ips=0)
+    drawn = flatten_layout(LayoutEngine(topology).calculate_layout())
+
+    vms = [n for n in drawn if n['type'] == "Microsoft.Compute/virtualMachines"]
+    assert len(vms) == 24
+    # Parents come before their children (frames are drawn underneath)
+    order = {id(n): i for i, n in enumerate(drawn)}
+    assert all(order[id(c)] > order[id(n)] for n in drawn for c in n['children'])
+
+
+def test_renderers_draw_subnet_summary_and_its_edges(parser_module, synthetic, tmp_path):
+    topology = _parsed_topology(parser_module, synthetic, vnets=1, subnets=2, vms=12, lbs=0, nsgs=0, public_ips=0)
+    engine = LayoutEngine(topology, aggregate=True, aggregate_threshold=10)
+    nodes = engine.calculate_layout()
+    drawn = {n['id'].lower(): n for n in flatten_layout(nodes)}
+
+    summaries = [n for n in drawn.values() if n['resource']['name'] == "12 VMs"]
+    assert len(summaries) == 2
+    summary_edges = [e for e in engine.get_relationships() if e['to'].lower() in {s['id'].lower() for s in summaries}]
+    assert len(summary_edges) == 2
+    assert all(e['from'].lower() in drawn for e in summary_edges)
+
+    # The preview renderer paints the summary's icon box
+    pytest.importorskip("PIL")
+    from PIL import Image
+    from core.renderer_preview import generate_preview_file
+    output = tmp_path / "preview.png"
+    generate_preview_file(nodes, engine.get_relationships(), str(output), scale=1)
+    summary = summaries[0]
+    with Image.open(output) as im:
+        centre = (int(summary['x'] + summary['w'] / 2), int(summary['y'] + 24))
+        assert im.convert("RGB").getpixel(centre) == (222, 236, 249)
+
+
+def test_children_stay_inside_their_container(parser_module, synthetic):
+    # 6 subnets: the VNet's first row of 4 wide subnet frames is full
+    topology = _parsed_topology(parser_module, synthetic, vnets=1, subnets=6, vms=30, lbs=0, nsgs=0, public_ips=0)
+    nodes = LayoutEngine(topology).calculate_layout()
+
+    for node in flatten_layout(nodes):
+        for child in node['children']:
+            assert child['x'] + child['w'] <= node['x'] + node['w']
+            assert child['y'] + child['h'] <= node['y'] + node['h']
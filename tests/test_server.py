@@ -0,0 +1,147 @@
+import asyncio
+import contextvars
+import cProfile
+import json
+import os
+import threading
+import time
+import uuid
+
+import pytest
+
+from core import metrics
+
+MOCK_TOPOLOGY = os.path.join(os.path.dirname(__file__), "mock_topology.json")
+
+
+def test_stage_time_excludes_waiting_for_the_profiler(server_main):
+    with metrics.job_metrics("job-00000001") as job:
+        with server_main._profile_lock:
+            # Another job's profiled stage holds the lock for 0.3 s.
+            # The worker runs in a copy of this context, like asyncio.to_thread.
+            worker = threading.Thread(
+                target=contextvars.copy_context().run,
+                args=(server_main._run_profiled, cProfile.Profile(), "layout", time.sleep, 0.01)
+            )
+            worker.start()
+            time.sleep(0.3)
+        worker.join()
+
+    assert 0.01 <= job["stages"]["layout"] < 0.2
+
+
+def test_job_keeps_blocking_work_off_the_event_loop(server_main, monkeypatch):
+    threads = []
+
+    def fake_renderer(nodes, edges, path):
+        with open(path, "wb") as f:
+            f.write(b"output")
+
+    def on_worker(func):
+        def wrapper(*args):
+            threads.append((func.__name__, threading.get_ident()))
+            return func(*args)
+        return wrapper
+
+    monkeypatch.setattr(server_main, "get_renderer", on_worker(lambda fmt: fake_renderer))
+    monkeypatch.setattr(server_main, "_dump_profile", on_worker(server_main._dump_profile))
+    monkeypatch.setattr(server_main, "_write_json", on_worker(server_main._write_json))
+
+    with open(MOCK_TOPOLOGY, encoding="utf-8") as f:
+        data = dict(json.load(f), profile=True)
+    request_id = str(uuid.uuid4())
+
+    async def run():
+        server_main.storage.create_job(request_id)
+        server_main.events.open_channel(request_id)
+        await server_main.run_job(request_id, data)
+        return threading.get_ident()
+
+    loop_thread = asyncio.run(run())
+
+    assert {name for name, _ in threads} == {"<lambda>", "_dump_profile", "_write_json"}
+    assert all(thread != loop_thread for _, thread in threads)
+    assert set(server_main.storage.load_manifest(request_id)) >= {
+        "preview.png", "topology.png", "topology.pptx", "metrics.json", "profile.prof", "profile.txt"
+    }
+
+
+def _replay(server_main, request_id):
+    async def collect():
+        return [chunk async for chunk in server_main._event_stream(request_id)]
+    received = []
+    for chunk in asyncio.run(collect()):
+        event_line, data_line = chunk.strip().split("\n")
+        received.append((event_line[len("event: "):], json.loads(data_line[len("data: "):])))
+    return received
+
+
+def _finished_job(server_main, tmp_path, outputs):
+    request_id = str(uuid.uuid4())
+    server_main.storage.create_job(request_id, active=False)
+    for name in outputs:
+        path = tmp_path / name
+        path.write_bytes(b"{}")
+        server_main.storage.commit_output(request_id, name, str(path))
+    return request_id
+
+
+def test_event_replay_of_finished_job(server_main, tmp_path):
+    request_id = _finished_job(server_main, tmp_path,
+                               ["preview.png", "topology.png", "topology.pptx", "metrics.json"])
+
+    received = _replay(server_main, request_id)
+
+    assert [name for name, _ in received] == ["preview", "png", "pptx", "done"]
+    assert received[1][1]["url"] == f"/download/{request_id}/topology.png"
+
+
+def test_event_replay_of_failed_job(server_main, tmp_path):
+    request_id = _finished_job(server_main, tmp_path, ["preview.png", "metrics.json"])
+
+    assert _replay(server_main, request_id) == [
+        ("preview", {"type": "preview", "url": f"/download/{request_id}/preview.png"}),
+        ("error", {"type": "error", "detail": "Generation failed"}),
+    ]
+
+
+def test_event_replay_of_job_without_outputs(server_main, tmp_path):
+    # Accepted by a server that stopped before finishing it
+    request_id = _finished_job(server_main, tmp_path, [])
+
+    assert _replay(server_main, request_id) == [
+        ("error", {"type": "error", "detail": "Job is not running on this server"})
+    ]
+
+
+def test_event_replay_of_deleted_job(server_main):
+    assert _replay(server_main, str(uuid.uuid4())) == [("error", {"type": "error", "detail": "Job not found"})]
+
+
+def _upload(server_main, payload):
+    import httpx
+
+    async def post():
+        transport = httpx.ASGITransport(app=server_main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await client.post("/api/topology/upload", json=payload)
+    return asyncio.run(post())
+
+
+def test_upload_rejects_negative_ttl(server_main):
+    resp = _upload(server_main, {"resourceGroup": "rg", "resources": [], "relationships": [], "ttlSeconds": -1})
+
+    assert resp.status_code == 422
+
+
+def test_failed_upload_releases_the_job(server_main, monkeypatch):
+    def fail(*args):
+        raise OSError("disk full")
+    monkeypatch.setattr(server_main.storage, "save_input", fail)
+    active = set(server_main.storage._active)
+
+    with pytest.raises(OSError):
+        _upload(server_main, {"resourceGroup": "rg", "resources": [], "relationships": []})
+
+    # Not left active: the GC may collect it
+    assert server_main.storage._active == active
@@ -0,0 +1,126 @@
+import gzip
+import json
+import os
+
+import pytest
+
+from core.storage import LocalDirectoryBackend, StorageManager, INPUT_NAME, JOB_META_NAME
+
+NOW = 1_700_000_000.0
+
+
+def _job_id(n):
+    return f"job-{n:08d}"
+
+
+@pytest.fixture
+def storage(tmp_path):
+    return StorageManager(LocalDirectoryBackend(str(tmp_path / "jobs")), default_ttl=3600)
+
+
+def _add_job(storage, tmp_path, n, size=100, created_at=NOW, ttl_seconds=None):
+    job_id = _job_id(n)
+    storage.create_job(job_id, ttl_seconds, created_at=created_at, active=False)
+    local = tmp_path / f"{job_id}.png"
+    local.write_bytes(b"x" * size)
+    storage.commit_output(job_id, "topology.png", str(local))
+    return job_id
+
+
+def test_expired_jobs_are_collected(storage, tmp_path):
+    old = _add_job(storage, tmp_path, 1, created_at=NOW - 7200)
+    fresh = _add_job(storage, tmp_path, 2, created_at=NOW - 60)
+    forever = _add_job(storage, tmp_path, 3, created_at=NOW - 7200, ttl_seconds=0)
+
+    result = storage.collect_garbage(now=NOW)
+
+    assert result["expired"] == 1
+    assert not storage.job_exists(old)
+    assert storage.job_exists(fresh)
+    assert storage.job_exists(forever)
+
+
+def test_quota_evicts_least_recently_used_first(tmp_path):
+    storage = StorageManager(LocalDirectoryBackend(str(tmp_path / "jobs")), default_ttl=0)
+    jobs = [_add_job(storage, tmp_path, n, size=1000) for n in range(3)]
+    job_size = storage.backend.list_jobs()[0]["size"]
+    storage.quota_bytes = job_size * 2
+
+    # Job 0 was downloaded most recently, job 1 least recently
+    storage.touch(jobs[0], NOW + 30)
+    storage.touch(jobs[1], NOW + 10)
+    storage.touch(jobs[2], NOW + 20)
+
+    result = storage.collect_garbage(now=NOW + 60)
+
+    assert result["evicted"] == 1
+    assert [storage.job_exists(j) for j in jobs] == [True, False, True]
+
+
+def test_active_jobs_are_never_collected(storage, tmp_path):
+    job_id = _job_id(1)
+    storage.create_job(job_id, created_at=NOW - 7200)
+    storage.quota_bytes = 1
+
+    assert storage.collect_garbage(now=NOW) == {"expired": 0, "evicted": 0, "freedBytes": 0}
+    assert storage.job_exists(job_id)
+
+    storage.finish_job(job_id)
+    assert storage.collect_garbage(now=NOW)["expired"] == 1
+    assert not storage.job_exists(job_id)
+
+
+@pytest.mark.parametrize("job_id", ["../../etc", "short", "a/b-c-d-e-f", "x" * 65, ""])
+def test_invalid_job_ids_are_rejected(storage, job_id):
+    with pytest.raises(ValueError):
+        storage.create_job(job_id)
+    assert not storage.job_exists(job_id)
+    assert storage.load_manifest(job_id) == {}
+    assert not storage.output_exists(job_id, "topology.png")
+
+
+def test_invalid_object_names_are_rejected(storage):
+    storage.create_job(_job_id(1))
+    for name in ["../job.json", "a/b", ".."]:
+        with pytest.raises(ValueError):
+            storage.open_output(_job_id(1), name)
+
+
+def test_commit_output_round_trip(storage, tmp_path):
+    job_id = _job_id(1)
+    storage.create_job(job_id)
+    local = tmp_path / "metrics.json"
+    local.write_text(json.dumps({"stages": {}}))
+
+    entry = storage.commit_output(job_id, "metrics.json", str(local))
+
+    assert storage.load_manifest(job_id) == {"metrics.json": entry}
+    assert entry["size"] == local.stat().st_size
+    with storage.open_output(job_id, "metrics.json") as f:
+        assert f.read() == local.read_bytes()
+    with storage.open_output(job_id, "metrics.json.gz") as f:
+        assert gzip.decompress(f.read()) == local.read_bytes()
+        assert f.tell() == entry["gzipSize"]
+
+
+def test_legacy_layout_is_imported(storage, tmp_path):
+    job_id = "0f8fad5b-d9cb-469f-a165-70867728950e"
+    uploads = tmp_path / "uploads"
+    outputs = tmp_path / "outputs" / job_id
+    outputs.mkdir(parents=True)
+    uploads.mkdir()
+    (uploads / f"{job_id}.json").write_text('{"resources": []}')
+    (outputs / "topology.png").write_bytes(b"png")
+    os.utime(outputs / "topology.png", (NOW - 100, NOW - 100))
+    os.utime(uploads / f"{job_id}.json", (NOW - 200, NOW - 200))
+
+    assert storage.import_legacy(str(uploads), str(tmp_path / "outputs")) == 1
+
+    assert not uploads.exists() and not (tmp_path / "outputs").exists()
+    assert set(storage.load_manifest(job_id)) == {"topology.png"}
+    with storage.open_output(job_id, INPUT_NAME) as f:
+        assert json.load(f) == {"resources": []}
+    with storage.open_output(job_id, JOB_META_NAME) as f:
+        assert json.load(f)["createdAt"] == NOW - 200
+    # Imported jobs are not active: old ones expire like any other
+    assert storage.collect_garbage(now=NOW + 3600)["expired"] == 1